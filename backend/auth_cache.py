@@ -0,0 +1,32 @@
+import hashlib
+import os
+import time
+
+from cache import TTLCache
+
+# Verified JWTs: token hash -> address, never kept past the token's own exp
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "3600"))
+# Authenticated users: address -> detached User row
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "30"))
+
+token_cache = TTLCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+
+def token_key(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def cache_token(token, address, exp):
+    token_cache.put(token_key(token), address, ttl=exp - time.time())
+
+
+def cached_token_address(token):
+    return token_cache.get(token_key(token))
+
+
+def invalidate_user(address):
+    """Call whenever a users row changes. Only reaches this process's cache."""
+    user_cache.pop(address)
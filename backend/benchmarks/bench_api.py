@@ -0,0 +1,120 @@
+"""
+Concurrent load against /stats, /users/{address}/locks, /locks and
+/auth/verify on a seeded database. Runs the app in-process by default, or
+against a live server with --base-url (seed that server's database first
+with the same DATABASE_URL).
+
+    python -m benchmarks.bench_api [--requests 1000] [--concurrency 50] [--base-url URL] [--json out.json]
+"""
+import asyncio
+import time
+
+from benchmarks.common import configure_env, drive, latency_summary, parser, report
+
+configure_env()
+
+import httpx  # noqa: E402
+from eth_account import Account  # noqa: E402
+from eth_account.messages import encode_defunct  # noqa: E402
+
+import main  # noqa: E402
+from signatures import login_message, signature_verifier  # noqa: E402
+from benchmarks.seed import seed_locks  # noqa: E402
+
+
+def client_for(base_url):
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=30)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench", timeout=30)
+
+
+async def signed_logins(client, count):
+    """Fresh nonces signed ahead of time, so only /auth/verify is timed"""
+    logins = []
+    for _ in range(count):
+        account = Account.create()
+        response = await client.post("/auth/nonce", json={"address": account.address})
+        nonce = response.json()["nonce"]
+        signature = account.sign_message(encode_defunct(text=login_message(nonce))).signature.hex()
+        logins.append({"address": account.address, "signature": signature})
+    return logins
+
+
+async def measure(send, requests, concurrency):
+    await drive(send, min(requests, 50), concurrency)  # warm up
+    start = time.perf_counter()
+    samples = await drive(send, requests, concurrency)
+    summary = latency_summary(samples)
+    summary["requests_per_sec"] = round(len(samples) / (time.perf_counter() - start), 1)
+    return summary
+
+
+async def run(args):
+    addresses = await seed_locks(users=args.users, locks_per_user=args.locks)
+    token = main.create_access_token({"sub": addresses[0]})
+    auth = {"Authorization": f"Bearer {token}"}
+
+    def expect_ok(response):
+        assert response.status_code in (200, 304), response.text
+
+    results = {"users": args.users, "locks_per_user": args.locks, "concurrency": args.concurrency}
+    async with client_for(args.base_url) as client:
+        async def stats(_):
+            expect_ok(await client.get("/stats"))
+
+        async def user_locks(i):
+            expect_ok(await client.get(f"/users/{addresses[i % len(addresses)]}/locks"))
+
+        async def my_locks(_):
+            expect_ok(await client.get("/locks", headers=auth))
+
+        logins = await signed_logins(client, args.logins + min(args.logins, 50))
+
+        # Latencies of accepted and of shed logins, kept apart: a 503 is the
+        # verifier's backpressure (SIGNATURE_MAX_PENDING), answered without
+        # verifying anything, so it would flatter the figures
+        verified, shed = [], []
+
+        async def verify(i):
+            start = time.perf_counter()
+            response = await client.post("/auth/verify", json=logins[i])
+            elapsed = time.perf_counter() - start
+            if response.status_code == 503:
+                shed.append(elapsed)
+            else:
+                expect_ok(response)
+                verified.append(elapsed)
+
+        results["stats"] = await measure(stats, args.requests, args.concurrency)
+        results["user_locks"] = await measure(user_locks, args.requests, args.concurrency)
+        results["my_locks"] = await measure(my_locks, args.requests, args.concurrency)
+        # Warm-up and timed runs must not reuse a single-use nonce
+        warmup = min(args.logins, 50)
+        await drive(verify, warmup, args.concurrency)
+        verified.clear()
+        shed.clear()
+        start = time.perf_counter()
+        await drive(lambda i: verify(warmup + i), args.logins, args.concurrency)
+        elapsed = time.perf_counter() - start
+        results["auth_verify"] = latency_summary(verified)
+        results["auth_verify"]["requests_per_sec"] = round(len(verified) / elapsed, 1)
+        results["auth_verify_shed_503"] = latency_summary(shed)
+
+    signature_verifier.close()
+    return results
+
+
+def main_cli():
+    p = parser("API latency under concurrent load")
+    p.add_argument("--requests", type=int, default=1000)
+    p.add_argument("--logins", type=int, default=300)
+    p.add_argument("--concurrency", type=int, default=50)
+    p.add_argument("--users", type=int, default=200)
+    p.add_argument("--locks", type=int, default=50, help="locks per user")
+    p.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    args = p.parse_args()
+    report("api", asyncio.run(run(args)), args.json_path)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,61 @@
+"""
+Latency of the authenticated /locks endpoint with and without the token and
+user caches.
+
+    python -m benchmarks.bench_auth_cache [--requests 2000] [--concurrency 20] [--json out.json]
+"""
+import asyncio
+import time
+
+from benchmarks.common import configure_env, drive, latency_summary, parser, report
+
+configure_env()
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from auth_cache import token_cache, user_cache, TOKEN_CACHE_TTL, USER_CACHE_TTL  # noqa: E402
+from benchmarks.seed import seed_locks  # noqa: E402
+
+
+async def get_locks(client, token, requests, concurrency):
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def send(_):
+        response = await client.get("/locks", headers=headers)
+        assert response.status_code == 200, response.text
+
+    return await drive(send, requests, concurrency)
+
+
+async def run(args):
+    addresses = await seed_locks(users=50, locks_per_user=args.locks)
+    token = main.create_access_token({"sub": addresses[0]})
+
+    transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label, ttls in (("uncached", (0, 0)), ("cached", (TOKEN_CACHE_TTL, USER_CACHE_TTL))):
+            token_cache.ttl, user_cache.ttl = ttls
+            token_cache.clear()
+            user_cache.clear()
+            await get_locks(client, token, 50, args.concurrency)  # warm up
+            start = time.perf_counter()
+            samples = await get_locks(client, token, args.requests, args.concurrency)
+            summary = latency_summary(samples)
+            summary["requests_per_sec"] = round(len(samples) / (time.perf_counter() - start), 1)
+            results[label] = summary
+    return results
+
+
+def main_cli():
+    p = parser("/locks latency with and without auth caches")
+    p.add_argument("--requests", type=int, default=2000)
+    p.add_argument("--concurrency", type=int, default=20)
+    p.add_argument("--locks", type=int, default=20, help="locks per user")
+    args = p.parse_args()
+    report("auth_cache", asyncio.run(run(args)), args.json_path)
+
+
+if __name__ == "__main__":
+    main_cli()
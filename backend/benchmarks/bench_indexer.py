@@ -0,0 +1,71 @@
+"""
+Indexer throughput (blocks/sec, events/sec) of the sync_blocks range loop
+against a mock RPC serving N thousand LockCreated/Withdrawal logs.
+
+    python -m benchmarks.bench_indexer [--locks 20000] [--blocks 50000] [--rpc-latency-ms 0] [--json out.json]
+"""
+import asyncio
+import time
+
+from benchmarks.common import configure_env, parser, report
+
+configure_env()
+
+from sqlalchemy import select, func  # noqa: E402
+
+import indexer  # noqa: E402
+from database import create_schema  # noqa: E402
+from models import Base, Lock, ChainEvent, PlatformStats  # noqa: E402
+from benchmarks.mock_rpc import MockChain, MockRPC  # noqa: E402
+
+CONTRACT_ADDRESS = "0x" + "5e" * 20
+
+
+async def reset_schema():
+    async with indexer.indexer_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(create_schema)
+
+
+async def run(args):
+    chain = MockChain(CONTRACT_ADDRESS, locks=args.locks, blocks=args.blocks)
+    rpc = MockRPC(chain, latency=args.rpc_latency_ms / 1000)
+    target = chain.target("bench")
+
+    await reset_schema()
+    indexer.block_timestamps.clear()
+
+    start = time.perf_counter()
+    await indexer.sync_blocks(rpc, target, 1, chain.tip, indexer.AdaptiveWindow())
+    elapsed = time.perf_counter() - start
+
+    async with indexer.IndexerSession() as session:
+        locks = await session.scalar(select(func.count(Lock.id)))
+        events = await session.scalar(select(func.count()).select_from(ChainEvent))
+        stats = await session.get(PlatformStats, 1)
+    assert locks == args.locks and events == chain.event_count, (locks, events)
+    assert stats.total_locks == locks
+
+    return {
+        "locks": args.locks,
+        "events": chain.event_count,
+        "blocks": chain.tip,
+        "rpc_latency_ms": args.rpc_latency_ms,
+        "rpc_calls": rpc.calls,
+        "seconds": round(elapsed, 3),
+        "blocks_per_sec": round(chain.tip / elapsed, 1),
+        "events_per_sec": round(chain.event_count / elapsed, 1),
+    }
+
+
+def main_cli():
+    p = parser("Indexer range loop throughput against a mock RPC")
+    p.add_argument("--locks", type=int, default=20000)
+    p.add_argument("--blocks", type=int, default=50000)
+    p.add_argument("--rpc-latency-ms", type=float, default=0.0)
+    args = p.parse_args()
+    report("indexer", asyncio.run(run(args)), args.json_path)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,82 @@
+"""
+Rows/sec of the lock listing read path: ORM entities validated through
+schemas.LockResponse (the previous path) versus column tuples serialized
+directly (serialization.py).
+
+    python -m benchmarks.bench_lock_serialization [--locks 10000] [--rounds 10] [--json out.json]
+"""
+import asyncio
+import json
+import time
+from typing import List
+
+from benchmarks.common import configure_env, parser, report
+
+configure_env()
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+import schemas  # noqa: E402
+from database import async_session  # noqa: E402
+from models import Lock  # noqa: E402
+from serialization import LOCK_RESPONSE_COLUMNS, lock_rows_to_dicts, dumps  # noqa: E402
+from benchmarks.seed import seed_locks  # noqa: E402
+
+lock_list = TypeAdapter(List[schemas.LockResponse])
+
+
+async def orm_path(address):
+    async with async_session() as session:
+        result = await session.execute(select(Lock).where(Lock.owner_address == address))
+        locks = result.scalars().all()
+    # What FastAPI does with response_model: validate, then dump
+    return lock_list.dump_json(lock_list.validate_python(locks, from_attributes=True))
+
+
+async def lean_path(address):
+    async with async_session() as session:
+        result = await session.execute(
+            select(*LOCK_RESPONSE_COLUMNS).where(Lock.owner_address == address)
+        )
+        rows = result.all()
+    return dumps(lock_rows_to_dicts(rows))
+
+
+async def measure(path, address, rounds, rows):
+    await path(address)  # warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await path(address)
+    elapsed = time.perf_counter() - start
+    return {
+        "ms_per_response": round(elapsed / rounds * 1000, 2),
+        "rows_per_sec": round(rows * rounds / elapsed),
+    }
+
+
+async def run(args):
+    [address] = await seed_locks(users=1, locks_per_user=args.locks)
+
+    # Both paths must produce the same document
+    assert json.loads(await orm_path(address)) == json.loads(await lean_path(address))
+
+    results = {"locks": args.locks}
+    for label, path in (("orm_pydantic", orm_path), ("lean_columns", lean_path)):
+        results[label] = await measure(path, address, args.rounds, args.locks)
+    results["speedup"] = round(
+        results["lean_columns"]["rows_per_sec"] / results["orm_pydantic"]["rows_per_sec"], 2
+    )
+    return results
+
+
+def main_cli():
+    p = parser("lock listing serialization throughput")
+    p.add_argument("--locks", type=int, default=10000)
+    p.add_argument("--rounds", type=int, default=10)
+    args = p.parse_args()
+    report("lock_serialization", asyncio.run(run(args)), args.json_path)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,61 @@
+"""
+Login signature recovery throughput.
+
+    python -m benchmarks.bench_signatures [--count 2000] [--json out.json]
+"""
+import asyncio
+import time
+
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+from benchmarks.common import parser, report
+from signatures import SignatureVerifier, login_message, recover_signer
+
+
+def sign_samples(count):
+    account = Account.create()
+    samples = []
+    for i in range(count):
+        text = login_message(f"{i:032x}")
+        signature = account.sign_message(encode_defunct(text=text)).signature.hex()
+        samples.append((text, signature))
+    return account.address, samples
+
+
+async def run_pool(verifier, samples):
+    return await asyncio.gather(*(verifier.recover(text, sig) for text, sig in samples))
+
+
+def main():
+    p = parser("Signature recovery throughput")
+    p.add_argument("--count", type=int, default=2000)
+    args = p.parse_args()
+
+    address, samples = sign_samples(args.count)
+
+    start = time.perf_counter()
+    for text, sig in samples[: max(1, args.count // 4)]:
+        assert recover_signer(text, sig) == address
+    single = max(1, args.count // 4) / (time.perf_counter() - start)
+
+    results = {"inline_per_core": round(single, 1)}
+    for kind in ("thread", "process"):
+        verifier = SignatureVerifier(executor=kind, max_pending=len(samples))
+        asyncio.run(run_pool(verifier, samples[:verifier.workers]))  # warm up workers
+        start = time.perf_counter()
+        recovered = asyncio.run(run_pool(verifier, samples))
+        elapsed = time.perf_counter() - start
+        verifier.close()
+        assert all(r == address for r in recovered)
+        results[f"{kind}_pool"] = {
+            "workers": verifier.workers,
+            "verifications_per_sec": round(len(samples) / elapsed, 1),
+            "per_core": round(len(samples) / elapsed / verifier.workers, 1),
+        }
+
+    report("signatures", results, args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Cold start of the API: import time of `main` (with the heaviest top-level
+packages from -X importtime) and, for a real uvicorn process, the time until
+/healthz and /readyz first answer 200.
+
+    python -m benchmarks.bench_startup [--runs 3] [--no-migrate] [--json out.json]
+
+--no-migrate starts the server with AUTO_MIGRATE=false after migrating once
+up front, the way a deploy with a release step would.
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.common import configure_env, parser, report
+
+configure_env()
+
+import httpx  # noqa: E402
+
+from database import init_db  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(top):
+    """Seconds to import main in a fresh interpreter, and the `top` packages costing most of it"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    # "import time: self [us] | cumulative | imported package"; the module's
+    # own time is summed per top-level package (web3, eth_account, ...)
+    total = 0
+    packages = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if name.strip() == "main":
+            total = int(cumulative)
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(own)
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "main_s": round(total / 1e6, 3),
+        "heaviest_s": {name: round(us / 1e6, 3) for name, us in heaviest},
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(client, url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(url).status_code == 200:
+                return True
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    return False
+
+
+def time_to_ready(auto_migrate, timeout):
+    """Seconds from spawning uvicorn to the first 200 from /healthz and from /readyz"""
+    port = free_port()
+    env = {
+        **os.environ,
+        "AUTO_MIGRATE": "true" if auto_migrate else "false",
+        "RUN_EMBEDDED_INDEXER": "false",
+        "LOG_LEVEL": "WARNING",
+    }
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + timeout
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1) as client:
+            if not wait_for(client, "/healthz", deadline):
+                raise RuntimeError("/healthz never answered")
+            healthy = time.perf_counter() - start
+            if not wait_for(client, "/readyz", deadline):
+                raise RuntimeError("/readyz never answered 200")
+            ready = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    return healthy, ready
+
+
+def run(args):
+    asyncio.run(init_db())
+    results = {"import": import_profile(args.top)}
+    healthy, ready = zip(*(time_to_ready(not args.no_migrate, args.timeout) for _ in range(args.runs)))
+    results["server"] = {
+        "auto_migrate": not args.no_migrate,
+        "runs": args.runs,
+        "healthz_s": round(min(healthy), 3),
+        "readyz_s": round(min(ready), 3),
+    }
+    return results
+
+
+def main_cli():
+    p = parser("API cold start: import time and time to healthy/ready")
+    p.add_argument("--runs", type=int, default=3, help="server starts; the fastest is reported")
+    p.add_argument("--top", type=int, default=8, help="heaviest packages to list")
+    p.add_argument("--timeout", type=float, default=60)
+    p.add_argument("--no-migrate", action="store_true", help="start with AUTO_MIGRATE=false")
+    args = p.parse_args()
+    report("startup", run(args), args.json_path)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+
+def configure_env():
+    """
+    Defaults that let the API modules import against a throwaway SQLite file.
+    Call before importing database/main; point DATABASE_URL at Postgres to
+    benchmark the real thing.
+    """
+    os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./benchmark.db")
+    os.environ.setdefault("JWT_SECRET", "benchmark-secret-benchmark-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    # Never contacted: benchmarks that need a node use benchmarks.mock_rpc
+    os.environ.setdefault("RPC_URL", "http://127.0.0.1:8545")
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(samples_seconds):
+    """p50/p99/mean in milliseconds"""
+    return {
+        "count": len(samples_seconds),
+        "p50_ms": round(percentile(samples_seconds, 50) * 1000, 3),
+        "p99_ms": round(percentile(samples_seconds, 99) * 1000, 3),
+        "mean_ms": round(sum(samples_seconds) / max(len(samples_seconds), 1) * 1000, 3),
+    }
+
+
+async def drive(send, requests, concurrency):
+    """
+    Calls `send(i)` for i in range(requests) from `concurrency` workers and
+    returns each call's latency in seconds.
+    """
+    samples = []
+    next_index = iter(range(requests))
+
+    async def worker():
+        for i in next_index:
+            start = time.perf_counter()
+            await send(i)
+            samples.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def parser(description):
+    p = argparse.ArgumentParser(description=description)
+    p.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    return p
+
+
+def report(name, results, json_path=None):
+    """Prints results and optionally writes them, tagged with commit and host"""
+    payload = {
+        "benchmark": name,
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    print(json.dumps(payload, indent=2))
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(payload, f, indent=2)
+    return payload
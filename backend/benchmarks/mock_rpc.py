@@ -0,0 +1,233 @@
+"""
+A deterministic in-memory chain of SwitchV2 logs that stands in for
+rpc.RPCClient, so indexer throughput can be measured without a node.
+The contract's view calls (lockIdCounter, locks) are answered from the same
+logs, directly or through Multicall3's aggregate3.
+"""
+import asyncio
+import random
+
+from eth_abi import decode, encode
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+
+GENESIS_TIMESTAMP = 1_700_000_000
+BLOCK_TIME = 12
+MULTICALL3_ADDRESS = Web3.to_checksum_address("0xcA11bde05977b3631167028862bE2a173976CA11")
+
+
+def topic(signature):
+    return HexBytes(Web3.keccak(text=signature))
+
+
+LOCK_CREATED = topic("LockCreated(uint256,address,uint256,uint256,string)")
+WITHDRAWAL = topic("Withdrawal(uint256,address,uint256)")
+EMERGENCY_WITHDRAWAL = topic("EmergencyWithdrawal(uint256,address,uint256,uint256)")
+
+
+def selector(signature):
+    return bytes(Web3.keccak(text=signature))[:4]
+
+
+AGGREGATE3 = selector("aggregate3((address,bool,bytes)[])")
+LOCK_ID_COUNTER = selector("lockIdCounter()")
+LOCKS = selector("locks(uint256)")
+LOCK_FIELDS = ["uint256", "address", "uint256", "uint256", "uint256", "string", "bool"]
+
+
+def indexed(value):
+    return HexBytes(value.to_bytes(32, "big"))
+
+
+def block_hash(number, fork=0):
+    suffix = f"-fork-{fork}" if fork else ""
+    return HexBytes(Web3.keccak(text=f"mock-block-{number}{suffix}"))
+
+
+class MockChain:
+    """
+    `locks` LockCreated events spread over `blocks` blocks, with a share of
+    them later withdrawn (normally or as an emergency, with a penalty).
+    `fork` replaces every block above a height, so reorgs can be replayed.
+    """
+
+    def __init__(self, contract_address, locks, blocks, withdraw_ratio=0.3, users=500, seed=7):
+        rng = random.Random(seed)
+        self.contract_address = Web3.to_checksum_address(contract_address)
+        self.tip = blocks
+        self.logs_by_block = {}
+        self.forks = []
+        addresses = [Web3.to_checksum_address(f"0x{rng.getrandbits(160):040x}") for _ in range(users)]
+
+        # Creations take the first two thirds of the chain, withdrawals the rest
+        creation_blocks = max(1, blocks * 2 // 3)
+        for lock_id in range(1, locks + 1):
+            owner = rng.choice(addresses)
+            amount = rng.randrange(10**15, 10**19)
+            created = 1 + (lock_id - 1) * creation_blocks // locks
+            unlock = GENESIS_TIMESTAMP + created * BLOCK_TIME + rng.randrange(3600, 86400 * 365)
+            self.add_lock(created, lock_id, owner, amount, unlock)
+
+            if rng.random() < withdraw_ratio:
+                withdrawn = rng.randrange(creation_blocks + 1, blocks + 1) if blocks > creation_blocks else created
+                if rng.random() < 0.5:
+                    self.add_withdrawal(withdrawn, lock_id, owner, amount)
+                else:
+                    penalty = amount // 10
+                    self._add(withdrawn, EMERGENCY_WITHDRAWAL, lock_id, owner,
+                              encode(["uint256", "uint256"], [amount - penalty, penalty]))
+
+        self.event_count = sum(len(logs) for logs in self.logs_by_block.values())
+
+    def add_lock(self, number, lock_id, owner, amount, unlock):
+        self._add(number, LOCK_CREATED, lock_id, owner,
+                  encode(["uint256", "uint256", "string"], [amount, unlock, f"Goal {lock_id}"]))
+
+    def add_withdrawal(self, number, lock_id, owner, amount):
+        self._add(number, WITHDRAWAL, lock_id, owner, encode(["uint256"], [amount]))
+
+    def fork(self, at, tip=None):
+        """Orphans every block above `at`: their logs are dropped and their hashes change"""
+        self.forks.append(at)
+        self.logs_by_block = {number: logs for number, logs in self.logs_by_block.items() if number <= at}
+        self.tip = tip if tip is not None else self.tip
+
+    def target(self, name="mock", chain_id=1337):
+        """An indexer target that decodes this chain's logs with the SwitchV2 ABI"""
+        import indexer
+        from targets import IndexTarget
+
+        target = IndexTarget(name, chain_id, self.contract_address, "abis/SwitchV2.json", 1)
+        # Offline Web3, as in the indexer: the contract only decodes logs
+        target.contract = indexer.get_contract(Web3(), target)
+        return target
+
+    def contract_state(self, block):
+        """lockIdCounter and the locks(id) structs as of `block`, replayed from the logs"""
+        locks = {}
+        for number in sorted(n for n in self.logs_by_block if n <= block):
+            for log in self.logs_by_block[number]:
+                lock_id = int.from_bytes(log["topics"][1], "big")
+                if log["topics"][0] == LOCK_CREATED:
+                    amount, unlock, goal = decode(["uint256", "uint256", "string"], log["data"])
+                    owner = Web3.to_checksum_address(log["topics"][2][-20:])
+                    locks[lock_id] = [lock_id, owner, amount, unlock, GENESIS_TIMESTAMP + number * BLOCK_TIME, goal, False]
+                elif lock_id in locks:
+                    locks[lock_id][6] = True
+        return max(locks, default=0) + 1, locks
+
+    def view_call(self, data, block):
+        """Return data of a SwitchV2 view call"""
+        data = bytes(data)
+        counter, locks = self.contract_state(block)
+        if data[:4] == LOCK_ID_COUNTER:
+            return encode(["uint256"], [counter])
+        if data[:4] == LOCKS:
+            (lock_id,) = decode(["uint256"], data[4:])
+            empty = [0, "0x" + "00" * 20, 0, 0, 0, "", False]
+            return encode(LOCK_FIELDS, locks.get(lock_id, empty))
+        raise ValueError(f"unknown selector {data[:4].hex()}")
+
+    def block_hash(self, number):
+        return block_hash(number, sum(1 for at in self.forks if number > at))
+
+    def _add(self, number, topic0, lock_id, owner, data):
+        logs = self.logs_by_block.setdefault(number, [])
+        logs.append(AttributeDict({
+            "address": self.contract_address,
+            "topics": [topic0, indexed(lock_id), HexBytes(bytes(12) + bytes.fromhex(owner[2:]))],
+            "data": HexBytes(data),
+            "blockNumber": number,
+            "blockHash": self.block_hash(number),
+            "logIndex": len(logs),
+            "transactionIndex": len(logs),
+            "transactionHash": HexBytes(Web3.keccak(text=f"mock-tx-{number}-{len(logs)}")),
+            "removed": False,
+        }))
+
+    def header(self, number):
+        return AttributeDict({
+            "number": number,
+            "hash": self.block_hash(number),
+            "parentHash": self.block_hash(number - 1),
+            "timestamp": GENESIS_TIMESTAMP + number * BLOCK_TIME,
+        })
+
+
+class MockRPC:
+    """
+    The subset of rpc.RPCClient the indexer and the reconciler call.
+    `latency` (seconds) is added to every call to model a remote node;
+    `multicall=False` models a chain without Multicall3.
+    """
+
+    def __init__(self, chain, latency=0.0, multicall=True):
+        self.chain = chain
+        self.latency = latency
+        self.multicall = multicall
+        self.calls = 0
+
+    async def _round_trip(self):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def connect(self):
+        return self
+
+    async def close(self):
+        pass
+
+    async def is_connected(self):
+        return True
+
+    async def block_number(self):
+        await self._round_trip()
+        return self.chain.tip
+
+    async def get_block(self, number):
+        await self._round_trip()
+        return self.chain.header(number)
+
+    async def get_blocks(self, numbers):
+        await self._round_trip()
+        return {number: self.chain.header(number) for number in set(numbers)}
+
+    async def get_logs(self, log_filter):
+        await self._round_trip()
+        # One OR-list per topic position, as the indexer sends them
+        topics = [{HexBytes(t) for t in options} for options in log_filter["topics"]]
+        logs = []
+        for number in range(log_filter["fromBlock"], log_filter["toBlock"] + 1):
+            for log in self.chain.logs_by_block.get(number, ()):
+                if all(log["topics"][i] in options for i, options in enumerate(topics)):
+                    logs.append(log)
+        return logs
+
+    def _call(self, transaction, block):
+        block = self.chain.tip if block == "latest" else block
+        to = Web3.to_checksum_address(transaction["to"])
+        data = HexBytes(transaction["data"])
+        if to == self.chain.contract_address:
+            return HexBytes(self.chain.view_call(data, block))
+        if to == MULTICALL3_ADDRESS and self.multicall and data[:4] == AGGREGATE3:
+            (calls,) = decode(["(address,bool,bytes)[]"], data[4:])
+            results = [(True, self.chain.view_call(call, block)) for _, _, call in calls]
+            return HexBytes(encode(["(bool,bytes)[]"], [results]))
+        # A call to an address without code succeeds with no data
+        return HexBytes(b"")
+
+    async def eth_call(self, transaction, block="latest"):
+        await self._round_trip()
+        return self._call(transaction, block)
+
+    async def eth_calls(self, transactions, block="latest"):
+        await self._round_trip()
+        return [self._call(transaction, block) for transaction in transactions]
+
+    async def get_code(self, address, block="latest"):
+        await self._round_trip()
+        address = Web3.to_checksum_address(address)
+        deployed = address == self.chain.contract_address or (self.multicall and address == MULTICALL3_ADDRESS)
+        return HexBytes(b"\x60\x80" if deployed else b"")
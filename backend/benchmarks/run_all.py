@@ -0,0 +1,96 @@
+"""
+Runs every benchmark in a fresh process and writes one combined JSON file,
+by default benchmarks/results/<commit>.json. With --compare, prints each
+numeric result next to a previous run's.
+
+    python -m benchmarks.run_all [--quick] [--out FILE] [--compare OLD.json]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import parser, _git_commit
+
+# module, full arguments, --quick arguments
+BENCHMARKS = [
+    ("bench_indexer", [], ["--locks", "2000", "--blocks", "5000"]),
+    ("bench_api", [], ["--requests", "200", "--logins", "50", "--users", "50", "--locks", "20"]),
+    ("bench_lock_serialization", [], ["--locks", "2000", "--rounds", "3"]),
+    ("bench_auth_cache", [], ["--requests", "300"]),
+    ("bench_signatures", [], ["--count", "500"]),
+    ("bench_startup", [], ["--runs", "1"]),
+]
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def run_benchmark(module, arguments):
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        path = f.name
+    try:
+        subprocess.run(
+            [sys.executable, "-m", f"benchmarks.{module}", "--json", path, *arguments],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+        with open(path) as f:
+            return json.load(f)
+    finally:
+        os.unlink(path)
+
+
+def flatten(results, prefix=""):
+    """{"a": {"b": 1}} -> {"a.b": 1}, numbers only"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old, new):
+    old_flat = flatten({b["benchmark"]: b["results"] for b in old["benchmarks"]})
+    new_flat = flatten({b["benchmark"]: b["results"] for b in new["benchmarks"]})
+    print(f"{'metric':60} {old['commit'] or '?':>12} {new['commit'] or '?':>12} {'change':>8}")
+    for name, value in new_flat.items():
+        if name not in old_flat:
+            continue
+        before = old_flat[name]
+        change = f"{(value - before) / before * 100:+.1f}%" if before else ""
+        print(f"{name:60} {before:>12} {value:>12} {change:>8}")
+
+
+def main_cli():
+    p = parser("Run the whole benchmark suite")
+    p.add_argument("--quick", action="store_true", help="small sizes, for a smoke run")
+    p.add_argument("--only", nargs="*", help="benchmark modules to run")
+    p.add_argument("--out", help="combined results file")
+    p.add_argument("--compare", help="previous combined results to compare against")
+    args = p.parse_args()
+
+    combined = {"commit": _git_commit(), "quick": args.quick, "benchmarks": []}
+    for module, full, quick in BENCHMARKS:
+        if args.only and module not in args.only:
+            continue
+        print(f"▶ {module}", file=sys.stderr)
+        combined["benchmarks"].append(run_benchmark(module, quick if args.quick else full))
+
+    out = args.out or args.json_path
+    if not out:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"{combined['commit'] or 'results'}.json")
+    with open(out, "w") as f:
+        json.dump(combined, f, indent=2)
+    print(f"Results written to {out}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), combined)
+
+
+if __name__ == "__main__":
+    main_cli()
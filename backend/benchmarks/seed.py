@@ -0,0 +1,55 @@
+import random
+from decimal import Decimal
+
+from eth_utils import to_checksum_address
+
+from database import engine, async_session, create_schema
+from models import Base, User, Lock
+from stats import recompute_platform_stats
+
+
+# Chain and contract the seeded locks belong to
+SEED_CHAIN_ID = 1337
+SEED_CONTRACT = to_checksum_address("0x" + "5e" * 20)
+
+def random_address(rng):
+    # Checksummed, like every address the API and indexer store
+    return to_checksum_address("0x" + "".join(rng.choice("0123456789abcdef") for _ in range(40)))
+
+
+async def seed_locks(users, locks_per_user, seed=7):
+    """Recreates the schema and inserts users with locks; returns their addresses"""
+    rng = random.Random(seed)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(create_schema)
+
+    addresses = [random_address(rng) for _ in range(users)]
+    lock_id = 1
+    async with async_session() as session:
+        session.add_all(User(address=address) for address in addresses)
+        await session.flush()
+        rows = []
+        for address in addresses:
+            for _ in range(locks_per_user):
+                created_at = 1_700_000_000 + lock_id * 12
+                rows.append({
+                    "chain_id": SEED_CHAIN_ID,
+                    "contract_address": SEED_CONTRACT,
+                    "id": lock_id,
+                    "owner_address": address,
+                    "amount": Decimal(rng.randrange(10**15, 10**18)),
+                    "unlock_timestamp": created_at + rng.randrange(3600, 86400 * 365),
+                    "created_at": created_at,
+                    "goal_name": f"Goal {lock_id}",
+                    "withdrawn": rng.random() < 0.3,
+                    "tx_hash": "0x" + f"{lock_id:064x}",
+                    "block_number": lock_id,
+                })
+                lock_id += 1
+        for i in range(0, len(rows), 5000):
+            await session.execute(Lock.__table__.insert(), rows[i:i + 5000])
+        # The summary row was seeded while the tables were still empty
+        await session.run_sync(lambda sync_session: recompute_platform_stats(sync_session.connection()))
+        await session.commit()
+    return addresses
@@ -0,0 +1,74 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Small LRU map. The indexer itself is single-threaded, but with
+    RUN_EMBEDDED_INDEXER it runs on its own thread and event loop inside the
+    API process, and its projections invalidate user_cache entries that the
+    API loop reads, so every access takes the lock.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TTLCache(LRUCache):
+    """LRU map whose entries also expire; a TTL of 0 disables caching"""
+
+    def __init__(self, maxsize, ttl):
+        super().__init__(maxsize)
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        entry = super().get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            with self._lock:
+                # Unless another thread stored a fresh entry meanwhile
+                if self._data.get(key) is entry:
+                    del self._data[key]
+            return default
+        return value
+
+    def put(self, key, value, ttl=None):
+        """Stores `value` for the cache TTL, or for `ttl` seconds if that is shorter"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        super().put(key, (value, time.monotonic() + ttl))
\ No newline at end of file
@@ -1,37 +1,203 @@
 import os
 from dotenv import load_dotenv
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import AddConstraint
+from sqlalchemy.dialects import postgresql, sqlite
 from models import Base
+from stats import seed_platform_stats
+from targets import legacy_target
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+def normalize_url(url):
+    """Hosted providers hand out postgres:// URLs; SQLAlchemy needs the async driver"""
+    if url and url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url and url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+DATABASE_URL = normalize_url(os.getenv("DATABASE_URL"))
 
 if not DATABASE_URL:
     raise ValueError("FATAL: DATABASE_URL is missing from environment variables.")
 
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
-elif DATABASE_URL.startswith("postgresql://"):
-    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+# Optional replica for read-only endpoints; defaults to the primary
+READ_DATABASE_URL = normalize_url(os.getenv("READ_DATABASE_URL")) or DATABASE_URL
+
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Migrate the schema whenever the API or a worker starts (the default).
+# Set to false where a release step runs `python init_db.py` instead, so
+# cold starts skip it, e.g. autoscaled API hosts.
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() == "true"
+# asyncpg's prepared statement cache breaks behind pgbouncer in transaction
+# mode, so it is off by default. Set e.g. 500 when connecting directly.
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "0"))
+
+def create_engine(url, pool_size=DB_POOL_SIZE, **overrides):
+    """
+    The one place engines are configured. Pool settings only apply to
+    Postgres; workers pass their own pool_size.
+    """
+    options = {"echo": DB_ECHO}
+    if url.startswith("postgresql+asyncpg"):
+        options.update(
+            pool_size=pool_size,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+            connect_args={"statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+        )
+    options.update(overrides)
+    return create_async_engine(url, **options)
 
-engine = create_async_engine(
-    DATABASE_URL, 
-    echo=True, 
-    connect_args={"statement_cache_size": 0} 
-)
+def create_sessionmaker(bind):
+    return async_sessionmaker(
+        bind=bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False
+    )
 
-async_session = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autoflush=False
-)
+engine = create_engine(DATABASE_URL)
+async_session = create_sessionmaker(engine)
+
+read_engine = engine if READ_DATABASE_URL == DATABASE_URL else create_engine(READ_DATABASE_URL)
+read_session = create_sessionmaker(read_engine)
 
 async def get_db():
     async with async_session() as session:
         yield session
 
-async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+async def get_read_db():
+    """Session for read-only endpoints; may lag the primary slightly"""
+    async with read_session() as session:
+        yield session
+
+def upsert(session, table):
+    """INSERT with ON CONFLICT support; SQLite stands in for Postgres in local runs"""
+    if session.bind.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+def add_missing_columns(sync_conn):
+    """create_all never alters existing tables, so add columns introduced since"""
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        added = [column for column in table.columns if column.name not in existing]
+        for column in added:
+            column_type = column.type.compile(dialect=sync_conn.dialect)
+            sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        for index in table.indexes:
+            if any(column in added for column in index.columns):
+                index.create(sync_conn, checkfirst=True)
+
+def add_missing_indexes(sync_conn):
+    """Likewise for indexes declared on tables that already exist"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+# Tables keyed by (chain_id, contract_address) since multi-target indexing
+CHAIN_KEYED_TABLES = ("locks", "notifications", "chain_events", "indexed_blocks", "sync_cursors")
+# Replaced by the ix_locks_owner_*_position indexes
+LEGACY_INDEXES = ("ix_locks_owner_created_id", "ix_locks_owner_active")
+
+def migrate_chain_keys(sync_conn):
+    """
+    Moves a single-contract database onto chain-keyed tables: existing rows
+    are attributed to the deployment_config.json target and the primary
+    keys rebuilt. Runs once, after add_missing_columns; afterwards a no-op.
+    """
+    inspector = inspect(sync_conn)
+    if not inspector.has_table("locks"):
+        return
+    if "chain_id" in inspector.get_pk_constraint("locks")["constrained_columns"]:
+        return
+
+    legacy = legacy_target()
+    if legacy is None:
+        raise RuntimeError("Existing data predates multi-chain keys; deployment_config.json is needed to attribute it")
+
+    for name in CHAIN_KEYED_TABLES:
+        sync_conn.execute(
+            text(f"UPDATE {name} SET chain_id = :chain_id, contract_address = COALESCE(contract_address, :address) WHERE chain_id IS NULL"),
+            {"chain_id": legacy.chain_id, "address": legacy.address},
+        )
+    for name in LEGACY_INDEXES:
+        sync_conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    if sync_conn.dialect.name == "postgresql":
+        _rekey_postgres_tables(sync_conn, inspector)
+    else:
+        _rebuild_sqlite_tables(sync_conn, inspector)
+
+def _rekey_postgres_tables(sync_conn, inspector):
+    notifications = Base.metadata.tables["notifications"]
+    for fk in inspector.get_foreign_keys("notifications"):
+        if fk["referred_table"] == "locks":
+            sync_conn.execute(text(f'ALTER TABLE notifications DROP CONSTRAINT "{fk["name"]}"'))
+
+    for name in CHAIN_KEYED_TABLES:
+        table = Base.metadata.tables[name]
+        old_key = inspector.get_pk_constraint(name)["name"]
+        new_key = ", ".join(column.name for column in table.primary_key.columns)
+        sync_conn.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT "{old_key}", ADD PRIMARY KEY ({new_key})'))
+
+    sync_conn.execute(text(
+        "ALTER TABLE notifications ALTER COLUMN chain_id SET NOT NULL, ALTER COLUMN contract_address SET NOT NULL"
+    ))
+    for constraint in notifications.foreign_key_constraints:
+        sync_conn.execute(AddConstraint(constraint))
+
+def _rebuild_sqlite_tables(sync_conn, inspector):
+    """SQLite cannot alter a primary key: copy each table into its new definition"""
+    for name in CHAIN_KEYED_TABLES:
+        table = Base.metadata.tables[name]
+        columns = ", ".join(column["name"] for column in inspector.get_columns(name))
+        for index in inspector.get_indexes(name):
+            sync_conn.execute(text(f'DROP INDEX IF EXISTS "{index["name"]}"'))
+        sync_conn.execute(text(f"ALTER TABLE {name} RENAME TO {name}_legacy"))
+        table.create(sync_conn)
+        sync_conn.execute(text(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {name}_legacy"))
+    for name in reversed(CHAIN_KEYED_TABLES):
+        sync_conn.execute(text(f"DROP TABLE {name}_legacy"))
+
+def create_schema(sync_conn):
+    Base.metadata.create_all(sync_conn)
+    add_missing_columns(sync_conn)
+    migrate_chain_keys(sync_conn)
+    add_missing_indexes(sync_conn)
+    seed_platform_stats(sync_conn)
+
+def missing_schema(sync_conn):
+    """Tables and columns the models declare but the database lacks"""
+    inspector = inspect(sync_conn)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            missing.append(table.name)
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing += [f"{table.name}.{column.name}" for column in table.columns if column.name not in existing]
+    return missing
+
+async def init_db(bind=None):
+    """Creates and migrates the schema; the explicit step is `python init_db.py`"""
+    async with (bind or engine).begin() as conn:
+        await conn.run_sync(create_schema)
+
+async def migrate_on_startup(bind=None):
+    """Startup hook of the API and the workers; a no-op unless AUTO_MIGRATE"""
+    if AUTO_MIGRATE:
+        await init_db(bind)
\ No newline at end of file
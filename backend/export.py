@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+import os
+
+from sqlalchemy import select
+
+from database import read_session
+from models import Lock, ChainEvent
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+class ExportSpec:
+    """The columns of one export and how a fetched row becomes a record"""
+
+    def __init__(self, columns, to_record):
+        self.columns = columns
+        self.fields = [column.key for column in columns]
+        self.to_record = to_record
+
+    def record(self, row):
+        return self.to_record(dict(zip(self.fields, row)))
+
+def lock_record(record):
+    # wei amounts overflow JSON numbers in most consumers
+    record["amount"] = str(int(record["amount"]))
+    return record
+
+LOCK_EXPORT = ExportSpec(
+    (
+        Lock.chain_id,
+        Lock.contract_address,
+        Lock.id,
+        Lock.owner_address,
+        Lock.amount,
+        Lock.goal_name,
+        Lock.unlock_timestamp,
+        Lock.created_at,
+        Lock.withdrawn,
+        Lock.block_number,
+        Lock.withdrawn_block,
+        Lock.tx_hash,
+    ),
+    lock_record,
+)
+
+EVENT_EXPORT = ExportSpec(
+    (
+        ChainEvent.chain_id,
+        ChainEvent.contract_address,
+        ChainEvent.block_number,
+        ChainEvent.log_index,
+        ChainEvent.event,
+        ChainEvent.lock_id,
+        ChainEvent.args,
+        ChainEvent.block_timestamp,
+        ChainEvent.tx_hash,
+    ),
+    lambda record: record,
+)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def export_query(from_block=None, to_block=None, created_after=None, created_before=None, chain_id=None):
+    """All locks in (chain, contract, id) order, narrowed by chain, creation block and/or timestamp"""
+    query = select(*LOCK_EXPORT.columns).order_by(Lock.chain_id, Lock.contract_address, Lock.id)
+    if chain_id is not None:
+        query = query.where(Lock.chain_id == chain_id)
+    if from_block is not None:
+        query = query.where(Lock.block_number >= from_block)
+    if to_block is not None:
+        query = query.where(Lock.block_number <= to_block)
+    if created_after is not None:
+        query = query.where(Lock.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(Lock.created_at < created_before)
+    return query
+
+def event_export_query(from_block=None, to_block=None, event=None, chain_id=None):
+    """Raw chain events in chain order, narrowed by chain, block range and event name"""
+    query = select(*EVENT_EXPORT.columns).order_by(ChainEvent.chain_id, ChainEvent.block_number, ChainEvent.log_index)
+    if chain_id is not None:
+        query = query.where(ChainEvent.chain_id == chain_id)
+    if from_block is not None:
+        query = query.where(ChainEvent.block_number >= from_block)
+    if to_block is not None:
+        query = query.where(ChainEvent.block_number <= to_block)
+    if event is not None:
+        query = query.where(ChainEvent.event == event)
+    return query
+
+def render_ndjson(spec, rows):
+    return "".join(json.dumps(spec.record(row)) + "\n" for row in rows)
+
+def render_csv(spec, rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=spec.fields)
+    if header:
+        writer.writeheader()
+    for row in rows:
+        record = spec.record(row)
+        # Nested values (event args) become a JSON cell
+        writer.writerow({
+            field: json.dumps(value) if isinstance(value, dict) else value
+            for field, value in record.items()
+        })
+    return buffer.getvalue()
+
+async def stream_export(spec, query, fmt):
+    """
+    Yields the export one batch at a time from a server-side cursor, so
+    memory stays flat however many rows match. Owns its session because it
+    keeps running after the endpoint has returned.
+    """
+    async with read_session() as session:
+        result = await session.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        first = True
+        async for rows in result.partitions():
+            if fmt == "csv":
+                yield render_csv(spec, rows, header=first)
+            else:
+                yield render_ndjson(spec, rows)
+            first = False
+
+        # An empty CSV export still gets its header
+        if first and fmt == "csv":
+            yield render_csv(spec, [], header=True)
\ No newline at end of file
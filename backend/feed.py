@@ -0,0 +1,129 @@
+import asyncio
+import json
+import os
+import threading
+
+from sqlalchemy import event, text
+
+from log import get_logger
+
+# Postgres NOTIFY channel the indexer publishes lock changes on
+FEED_CHANNEL = os.getenv("FEED_CHANNEL", "lock_changes")
+FEED_QUEUE_SIZE = int(os.getenv("FEED_QUEUE_SIZE", "256"))
+FEED_KEEPALIVE_SECONDS = int(os.getenv("FEED_KEEPALIVE_SECONDS", "15"))
+FEED_RECONNECT_SECONDS = int(os.getenv("FEED_RECONNECT_SECONDS", "5"))
+
+logger = get_logger("feed")
+
+class Broadcaster:
+    """
+    In-process fan-out of lock changes to per-address subscribers. publish()
+    may be called from any thread, e.g. by an embedded indexer.
+    """
+
+    def __init__(self, queue_size=FEED_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, address):
+        """Registers a queue on the running loop for `address`'s changes"""
+        queue = asyncio.Queue(self.queue_size)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(address.lower(), set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, address, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(address.lower())
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[address.lower()]
+
+    def publish(self, change):
+        with self._lock:
+            subscribers = list(self._subscribers.get(change["owner_address"].lower(), ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_offer, queue, change)
+
+    def publish_many(self, changes):
+        for change in changes:
+            self.publish(change)
+
+def _offer(queue, change):
+    # A client that stops reading loses its oldest changes, not the API's memory
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(change)
+
+broadcaster = Broadcaster()
+
+async def publish_changes(session, changes):
+    """
+    Call inside the transaction that wrote `changes`. On Postgres they go
+    out through NOTIFY, which is delivered on commit and dropped on rollback.
+    Elsewhere they reach this process's subscribers after commit.
+    """
+    if not changes:
+        return
+    if session.bind.dialect.name == "postgresql":
+        await session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            [{"channel": FEED_CHANNEL, "payload": json.dumps(change)} for change in changes],
+        )
+    else:
+        event.listen(
+            session.sync_session, "after_commit",
+            lambda _: broadcaster.publish_many(changes),
+            once=True,
+        )
+
+async def listen_for_changes(dsn):
+    """
+    Relays NOTIFYs from every indexer process into the local broadcaster.
+    Holds one dedicated asyncpg connection and reconnects if it drops.
+    """
+    import asyncpg
+
+    def relay(connection, pid, channel, payload):
+        broadcaster.publish(json.loads(payload))
+
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(dsn)
+            await connection.add_listener(FEED_CHANNEL, relay)
+            logger.info("feed_listening", channel=FEED_CHANNEL)
+            while not connection.is_closed():
+                await asyncio.sleep(FEED_KEEPALIVE_SECONDS)
+                await connection.execute("SELECT 1")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("feed_listener_lost", error=str(e))
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+        await asyncio.sleep(FEED_RECONNECT_SECONDS)
+
+def sse_event(change):
+    return f"event: {change['type']}\ndata: {json.dumps(change)}\n\n"
+
+async def stream_changes(request, address):
+    """Server-Sent Events for one address until the client disconnects"""
+    subscriber = broadcaster.subscribe(address)
+    _, queue = subscriber
+    try:
+        # Tells the client the stream is live before the first change
+        yield ": connected\n\n"
+        while not await request.is_disconnected():
+            try:
+                change = await asyncio.wait_for(queue.get(), FEED_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield sse_event(change)
+    finally:
+        broadcaster.unsubscribe(address, subscriber)
\ No newline at end of file
@@ -1,195 +1,549 @@
 import asyncio
+from contextlib import asynccontextmanager
+from collections import deque
 import os
-import json
-from web3 import Web3
-from sqlalchemy import select, update
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from models import User, Lock
+from datetime import datetime
+from web3 import Web3, AsyncWeb3, WebSocketProvider
+from sqlalchemy import select, update, delete, text
+from models import Lock, SyncCursor, IndexedBlock, ChainEvent, Notification
+from database import migrate_on_startup, create_engine, create_sessionmaker, upsert, DATABASE_URL
+from cache import LRUCache
+from rpc import RPCClient, RPCBudget
+from stats import apply_stats_delta
+from feed import publish_changes
+from projections import RangeWriter, event_row, lock_change
+from metrics import stage_timer, observe_sync_position, track_pool, serve_metrics, EVENTS_INDEXED, INDEXER_REORGS
+from log import get_logger
+from targets import selected_targets
 from dotenv import load_dotenv
 
 load_dotenv()
 
-RPC_URL = os.getenv("RPC_URL")
-DATABASE_URL = os.getenv("DATABASE_URL")
+logger = get_logger("indexer")
 
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
-elif DATABASE_URL and DATABASE_URL.startswith("postgresql://"):
-    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+# A small pool of its own: one leader lock connection per target plus
+# range writes; raise it when indexing many targets in one process
+INDEXER_DB_POOL_SIZE = int(os.getenv("INDEXER_DB_POOL_SIZE", "4"))
+indexer_engine = create_engine(DATABASE_URL, pool_size=INDEXER_DB_POOL_SIZE)
+IndexerSession = create_sessionmaker(indexer_engine)
+track_pool("indexer", indexer_engine)
 
-if not RPC_URL:
-    print("❌ CRITICAL: RPC_URL is missing from .env")
-    
-if not DATABASE_URL:
-    print("❌ CRITICAL: DATABASE_URL is missing from .env")
+# Every indexer process competes, per target, for the Postgres advisory
+# lock (LEADER_LOCK_KEY, target.lock_key); only the holder indexes that
+# target, the rest stand by and take over if it goes away.
+LEADER_LOCK_KEY = int(os.getenv("INDEXER_LEADER_LOCK_KEY", "7240117"))
+LEADER_CHECK_SECONDS = int(os.getenv("INDEXER_LEADER_CHECK_SECONDS", "15"))
 
-assert DATABASE_URL is not None, "DATABASE_URL must be set"
+# Requests per second allowed against each RPC endpoint, shared round-robin
+# by the targets using it; 0 means unlimited
+RPC_RATE_LIMIT = float(os.getenv("INDEXER_RPC_RATE_LIMIT", "0"))
+RPC_BURST = int(os.getenv("INDEXER_RPC_BURST", "0")) or None
 
-indexer_engine = create_async_engine(
-    DATABASE_URL, 
-    echo=False, 
-    connect_args={"statement_cache_size": 0}
-)
+# Backfill tuning: the get_logs window grows while responses stay small
+# and halves whenever the provider rejects a range.
+INITIAL_BLOCK_RANGE = int(os.getenv("INDEXER_INITIAL_BLOCK_RANGE", "500"))
+MAX_BLOCK_RANGE = int(os.getenv("INDEXER_MAX_BLOCK_RANGE", "50000"))
+TARGET_LOGS_PER_RANGE = int(os.getenv("INDEXER_TARGET_LOGS_PER_RANGE", "1000"))
+BACKFILL_CONCURRENCY = int(os.getenv("INDEXER_BACKFILL_CONCURRENCY", "4"))
+
+# (chain id, block number) -> timestamp, shared by every target and range
+BLOCK_CACHE_SIZE = int(os.getenv("INDEXER_BLOCK_CACHE_SIZE", "10000"))
+block_timestamps = LRUCache(BLOCK_CACHE_SIZE)
+
+# In push mode the poll only backs up the subscription
+SUBSCRIPTION_FALLBACK_POLL_SECONDS = int(os.getenv("INDEXER_FALLBACK_POLL_SECONDS", "60"))
 
-IndexerSession = async_sessionmaker(
-    bind=indexer_engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autoflush=False
+# Blocks within this distance of the tip may still be reorganised away
+CONFIRMATIONS = int(os.getenv("INDEXER_CONFIRMATIONS", "12"))
+
+INDEXED_EVENTS = ("LockCreated", "Withdrawal", "EmergencyWithdrawal")
+
+# Substrings providers use when a range is too large or too slow to serve
+RANGE_LIMIT_ERRORS = (
+    "too many results",
+    "query returned more than",
+    "limit exceeded",
+    "response size",
+    "block range",
+    "range is too large",
+    "timeout",
+    "timed out",
 )
 
-CONTRACT_ADDRESS = ""
-START_BLOCK = 10179178
-try:
-    with open("deployment_config.json", "r") as f:
-        config = json.load(f)
-        CONTRACT_ADDRESS = config["contract_address"].strip()
-        START_BLOCK = config.get("deployed_at_block", 10179178) 
-except FileNotFoundError:
-    print("⚠️ Config not found. Using defaults.")
+def is_range_limit_error(error):
+    """True when the provider refused a range because of its size or latency"""
+    if isinstance(error, TimeoutError):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in RANGE_LIMIT_ERRORS)
 
-def safe_get_logs(event_source, start, end):
-    """
-    Tries to fetch logs using snake_case (Web3 v6+ / Render). 
-    If that fails, falls back to camelCase (Web3 v5 / Local / Brownie).
-    """
-    try:
-        return event_source.get_logs(from_block=start, to_block=end)
-    except TypeError:
-        return event_source.get_logs(fromBlock=start, toBlock=end)
-
-def get_contract(w3):
-    possible_paths = [
-        "abis/SwitchV2.json",
-        "../build/contracts/SwitchV2.json",
-        "build/contracts/SwitchV2.json"
-    ]
-    abi = None
-    
-    for path in possible_paths:
-        try:
-            with open(path, "r") as f:
-                data = json.load(f)
-                abi = data["abi"]
-                break
-        except FileNotFoundError:
-            continue
-            
+class ChainReorganized(Exception):
+    """An indexed block is no longer on the canonical chain"""
+
+    def __init__(self, block_number):
+        super().__init__(f"block {block_number} was orphaned")
+        self.block_number = block_number
+
+class AdaptiveWindow:
+    """Block range size shared by the backfill fetchers"""
+
+    def __init__(self, size=INITIAL_BLOCK_RANGE, maximum=MAX_BLOCK_RANGE):
+        self.size = max(1, min(size, maximum))
+        self.maximum = maximum
+
+    def record(self, log_count):
+        if log_count < TARGET_LOGS_PER_RANGE // 2:
+            self.size = min(self.size * 2, self.maximum)
+
+    def shrink(self):
+        self.size = max(1, self.size // 2)
+
+def get_contract(w3, target):
+    """The target's contract with its event dispatch, or None without an ABI"""
+    abi = target.load_abi()
     if not abi:
-        print("❌ ERROR: Could not find ABI file.")
+        logger.error("abi_not_found", target=target.name, path=target.abi_path)
         return None
 
-    safe_address = w3.to_checksum_address(CONTRACT_ADDRESS)
-    return w3.eth.contract(address=safe_address, abi=abi)
+    contract = w3.eth.contract(address=target.address, abi=abi)
+    contract.event_dispatch = build_event_dispatch(contract)
+    return contract
+
+def build_event_dispatch(contract):
+    """Maps topic0 of every indexed event to its decoder, built once from the ABI"""
+    dispatch = {}
+    for item in contract.abi:
+        if item.get("type") != "event" or item["name"] not in INDEXED_EVENTS:
+            continue
+        signature = f"{item['name']}({','.join(i['type'] for i in item['inputs'])})"
+        dispatch[bytes(Web3.keccak(text=signature))] = getattr(contract.events, item["name"])()
+    return dispatch
+
+async def load_sync_cursor(session, target):
+    """Returns the last fully indexed block for a target, or None on first run"""
+    cursor = await session.get(SyncCursor, (target.chain_id, target.address))
+    return cursor.last_block if cursor else None
+
+async def save_sync_cursor(session, target, block_number):
+    """
+    Advances the checkpoint. Call inside the same session as the indexed rows
+    so the cursor and the data commit (or roll back) together.
+    """
+    stmt = upsert(session, SyncCursor).values(
+        chain_id=target.chain_id,
+        contract_address=target.address,
+        last_block=block_number,
+        updated_at=datetime.utcnow(),
+    )
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=["chain_id", "contract_address"],
+        set_={"last_block": stmt.excluded.last_block, "updated_at": stmt.excluded.updated_at},
+    ))
 
-async def process_lock_created(session, event, w3):
+async def prefetch_block_timestamps(rpc, target, block_numbers):
+    """Fills the timestamp cache for every block not already in it, in one batch"""
+    missing = [n for n in set(block_numbers) if (target.chain_id, n) not in block_timestamps]
+    if missing:
+        with stage_timer(target.name, "get_block"):
+            headers = await rpc.get_blocks(missing)
+        for number, block in headers.items():
+            block_timestamps.put((target.chain_id, number), block['timestamp'])
+
+async def fetch_range_logs(rpc, target, start, end, lock_ids=None):
+    """
+    Every indexed event in [start, end] from a single eth_getLogs call
+    (topic0 OR-list), decoded and sorted in chain order. `lock_ids` narrows
+    it to those locks' events (lockId is topic1 of all three).
+    """
+    contract = target.contract
+    topics = [[Web3.to_hex(topic) for topic in contract.event_dispatch]]
+    if lock_ids:
+        topics.append(["0x" + format(lock_id, "064x") for lock_id in lock_ids])
+    with stage_timer(target.name, "get_logs"):
+        raw_logs = await rpc.get_logs({
+            "address": contract.address,
+            "fromBlock": start,
+            "toBlock": end,
+            "topics": topics,
+        })
+
+    events = []
+    for log in raw_logs:
+        decoder = contract.event_dispatch.get(bytes(log["topics"][0]))
+        if decoder:
+            events.append(decoder.process_log(log))
+    events.sort(key=lambda event: (event['blockNumber'], event['logIndex']))
+    return events
+
+async def fetch_logs_adaptive(rpc, target, start, end, window, lock_ids=None):
+    """Fetches [start, end], splitting it in half whenever the provider rejects it"""
     try:
-        args = event['args']
-        user_address = args['user']
-        lock_id = args['lockId']
-        
-        result = await session.execute(select(User).where(User.address == user_address))
-        user = result.scalars().first()
-        
-        if not user:
-            print(f"👤 New User detected: {user_address}")
-            user = User(address=user_address)
-            session.add(user)
-            await session.flush()
-
-        result = await session.execute(select(Lock).where(Lock.id == lock_id))
-        existing_lock = result.scalars().first()
-
-        if not existing_lock:
-            block_data = w3.eth.get_block(event['blockNumber'])
-            timestamp = block_data['timestamp']
-
-            new_lock = Lock(
-                id=lock_id,
-                owner_address=user_address,
-                amount=str(args['amount']), 
-                unlock_timestamp=args['unlockTimestamp'],
-                created_at=timestamp,
-                goal_name=args['goalName'],
-                withdrawn=False,
-                tx_hash=event['transactionHash'].hex()
-            )
-            session.add(new_lock)
-            print(f"🔐 Indexed Lock #{lock_id}")
-            
+        logs = await fetch_range_logs(rpc, target, start, end, lock_ids)
     except Exception as e:
-        print(f"⚠️ Error processing lock: {e}")
+        if start == end or not is_range_limit_error(e):
+            raise
+        window.shrink()
+        middle = (start + end) // 2
+        left = await fetch_logs_adaptive(rpc, target, start, middle, window, lock_ids)
+        right = await fetch_logs_adaptive(rpc, target, middle + 1, end, window, lock_ids)
+        return left + right
+
+    window.record(len(logs))
+    # Every stored event carries its block time, not only LockCreated
+    await prefetch_block_timestamps(rpc, target, [event['blockNumber'] for event in logs])
+    return logs
+
+async def fetch_range(rpc, target, start, end, window, tip):
+    """
+    Logs for [start, end]. When the range reaches into the unconfirmed
+    blocks, also the header of `start` (for the parent check) and of every
+    unconfirmed block, so a later reorg can be traced to its exact fork point.
+    """
+    logs = await fetch_logs_adaptive(rpc, target, start, end, window)
+    headers = {}
+    if end > tip - CONFIRMATIONS:
+        unconfirmed = range(max(start, tip - CONFIRMATIONS + 1), end + 1)
+        with stage_timer(target.name, "get_block"):
+            headers = await rpc.get_blocks([start, *unconfirmed])
+    return logs, headers
+
+async def record_block_hashes(session, target, headers, tip):
+    """Remembers unconfirmed headers and forgets the ones that are now final"""
+    for header in headers.values():
+        stmt = upsert(session, IndexedBlock).values(
+            chain_id=target.chain_id,
+            contract_address=target.address,
+            number=header['number'],
+            hash=Web3.to_hex(header['hash']),
+            parent_hash=Web3.to_hex(header['parentHash']),
+        )
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=["chain_id", "contract_address", "number"],
+            set_={"hash": stmt.excluded.hash, "parent_hash": stmt.excluded.parent_hash},
+        ))
+    await session.execute(delete(IndexedBlock).where(
+        *indexed_by(IndexedBlock, target), IndexedBlock.number < tip - CONFIRMATIONS
+    ))
+
+def indexed_by(model, target):
+    """WHERE clauses restricting a chain-keyed table to one target's rows"""
+    return model.chain_id == target.chain_id, model.contract_address == target.address
+
+async def apply_range(rpc, target, start, end, logs, headers, tip):
+    """Writes one fetched range and its checkpoint in a single transaction"""
+    await prefetch_block_timestamps(rpc, target, [event['blockNumber'] for event in logs])
+    writer = RangeWriter()
+    for event in logs:
+        block_timestamp = block_timestamps.get((target.chain_id, event['blockNumber']))
+        writer.add(event_row(target.chain_id, target.address, event, block_timestamp))
+
+    async with IndexerSession() as session:
+        if headers:
+            # The range must extend the chain we indexed last time
+            parent = await session.get(IndexedBlock, (target.chain_id, target.address, start - 1))
+            if parent and parent.hash != Web3.to_hex(headers[start]['parentHash']):
+                raise ChainReorganized(start - 1)
+
+        with stage_timer(target.name, "db_flush"):
+            await writer.flush(session)
+            await publish_changes(session, writer.changes)
+            if headers:
+                await record_block_hashes(session, target, headers, tip)
+            await save_sync_cursor(session, target, end)
+        with stage_timer(target.name, "db_commit"):
+            await session.commit()
+
+    for event in logs:
+        EVENTS_INDEXED.labels(target.name, event['event']).inc()
+    observe_sync_position(target.name, end, tip)
+
+async def find_fork_point(rpc, target):
+    """
+    Highest remembered block that is still canonical. Every unconfirmed
+    block is remembered, so the walk stops at the first orphaned one.
+    """
+    async with IndexerSession() as session:
+        result = await session.execute(
+            select(IndexedBlock.number, IndexedBlock.hash)
+            .where(*indexed_by(IndexedBlock, target))
+            .order_by(IndexedBlock.number)
+        )
+        stored = result.all()
+
+    latest_block = await rpc.block_number()
+    canonical = await rpc.get_blocks([number for number, _ in stored if number <= latest_block])
+
+    fork_point = stored[0].number - 1
+    for number, block_hash in stored:
+        header = canonical.get(number)
+        # A gap means the blocks in between were never checked
+        if number != fork_point + 1 or header is None or Web3.to_hex(header['hash']) != block_hash:
+            break
+        fork_point = number
+    if fork_point < stored[0].number:
+        logger.error("reorg_deeper_than_confirmations", target=target.name, oldest_remembered=stored[0].number)
+    return fork_point
+
+async def rollback_reorg(rpc, target):
+    """Undoes the target's lock inserts and withdrawals above the fork point"""
+    fork_point = await find_fork_point(rpc, target)
+    contract_key = (target.chain_id, target.address)
 
+    async with IndexerSession() as session:
+        # Reminders reference the orphaned locks, so they go first
+        orphaned = select(Lock.id).where(*indexed_by(Lock, target), Lock.block_number > fork_point)
+        await session.execute(
+            delete(Notification).where(*indexed_by(Notification, target), Notification.lock_id.in_(orphaned))
+        )
+        result = await session.execute(
+            delete(Lock)
+            .where(*indexed_by(Lock, target), Lock.block_number > fork_point)
+            .returning(Lock.id, Lock.owner_address, Lock.amount, Lock.withdrawn)
+        )
+        removed = result.all()
+        tvl_delta = -sum(int(row.amount) for row in removed if not row.withdrawn)
+        changes = [
+            lock_change("lock_removed", *contract_key, row.id, row.owner_address, fork_point)
+            for row in removed
+        ]
 
-async def _indexer_logic():
-    """The async logic that runs inside the thread"""
-    print("🚀 Indexer Thread Started...")
-    
-    w3 = Web3(Web3.HTTPProvider(RPC_URL, request_kwargs={'timeout': 10}))
-    
-    if not w3.is_connected():
-        print("❌ Indexer could not connect to RPC.")
+        result = await session.execute(
+            update(Lock)
+            .where(*indexed_by(Lock, target), Lock.withdrawn_block > fork_point)
+            .values(withdrawn=False, withdrawn_block=None)
+            .returning(Lock.id, Lock.owner_address, Lock.amount)
+        )
+        for row in result.all():
+            tvl_delta += int(row.amount)
+            changes.append(lock_change("lock_unwithdrawn", *contract_key, row.id, row.owner_address, fork_point))
+
+        # Users first seen in orphaned blocks are kept, as before
+        await apply_stats_delta(session, locks=-len(removed), tvl_wei=tvl_delta)
+        await publish_changes(session, changes)
+        await session.execute(delete(ChainEvent).where(*indexed_by(ChainEvent, target), ChainEvent.block_number > fork_point))
+        await session.execute(delete(IndexedBlock).where(*indexed_by(IndexedBlock, target), IndexedBlock.number > fork_point))
+        await save_sync_cursor(session, target, fork_point)
+        await session.commit()
+
+    INDEXER_REORGS.labels(target.name).inc()
+    logger.warning("reorg_rolled_back", target=target.name, fork_point=fork_point, locks_removed=len(removed))
+
+async def sync_blocks(rpc, target, from_block, to_block, window):
+    """
+    Indexes [from_block, to_block]. Up to BACKFILL_CONCURRENCY non-overlapping
+    ranges are fetched at once, overlapping with the database writes, but they
+    are always written in block order so the cursor never skips past an
+    unwritten range.
+    """
+    pending = deque()
+    next_start = from_block
+    try:
+        while pending or next_start <= to_block:
+            while len(pending) < BACKFILL_CONCURRENCY and next_start <= to_block:
+                end = min(next_start + window.size - 1, to_block)
+                task = asyncio.create_task(fetch_range(rpc, target, next_start, end, window, to_block))
+                pending.append((next_start, end, task))
+                next_start = end + 1
+
+            start, end, task = pending.popleft()
+            logs, headers = await task
+            await apply_range(rpc, target, start, end, logs, headers, to_block)
+            if to_block - end > window.size:
+                logger.info("range_synced", target=target.name, start=start, end=end, events=len(logs), behind=to_block - end, sample=True)
+    finally:
+        for _, _, task in pending:
+            task.cancel()
+
+async def resume_block(rpc, target):
+    """First block that still needs indexing, from the checkpoint or the target's start block"""
+    async with IndexerSession() as session:
+        last_synced = await load_sync_cursor(session, target)
+
+    if last_synced is not None:
+        return last_synced + 1
+
+    chain_tip = await rpc.block_number()
+    if target.start_block > chain_tip:
+        # Local chains (ganache/anvil) start well below the Sepolia deploy block
+        return max(chain_tip - 10, 0)
+    return target.start_block
+
+async def watch_contract_logs(target, wake):
+    """
+    Sets `wake` whenever the node pushes a log for the contract. The range
+    poll does the actual indexing, so a reconnect only has to wake it up to
+    fill whatever was missed while the socket was down.
+    """
+    topics = [Web3.to_hex(topic) for topic in target.contract.event_dispatch]
+    while True:
+        try:
+            async with AsyncWeb3(WebSocketProvider(target.ws_url)) as ws:
+                await ws.eth.subscribe("logs", {"address": target.address, "topics": [topics]})
+                logger.info("log_subscription_started", target=target.name)
+                wake.set()
+                async for _ in ws.socket.process_subscriptions():
+                    wake.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("log_subscription_dropped", target=target.name, error=str(e))
+        wake.set()
+        await asyncio.sleep(5)
+
+async def wait_for_new_blocks(target, wake, poll_seconds):
+    """Sleeps until the subscription reports a log, or poll_seconds without one"""
+    if target.ws_url:
+        poll_seconds = SUBSCRIPTION_FALLBACK_POLL_SECONDS
+    try:
+        await asyncio.wait_for(wake.wait(), poll_seconds)
+    except asyncio.TimeoutError:
+        pass
+    wake.clear()
+
+
+async def _indexer_logic(target, throttle=None):
+    """The async logic for one target, inside the indexer's event loop"""
+    logger.info("indexer_started", target=target.name, chain_id=target.chain_id, contract=target.address)
+    if not target.rpc_url:
+        logger.error("rpc_url_missing", target=target.name)
         return
 
-    contract = get_contract(w3)
-    if not contract:
-        print("❌ Indexer halted: No contract.")
+    rpc = await RPCClient(target.rpc_url, throttle=throttle).connect()
+    try:
+        await _index_forever(rpc, target)
+    finally:
+        await rpc.close()
+
+async def _index_forever(rpc, target):
+    # No connectivity probe: an unreachable node fails the first call below,
+    # which is logged and retried like any other RPC error
+    # Offline Web3: the contract object is only used to decode logs
+    target.contract = get_contract(Web3(), target)
+    if not target.contract:
+        logger.error("indexer_halted", target=target.name, reason="no contract")
         return
 
-    current_sync_block = START_BLOCK
-    chain_tip = w3.eth.block_number
-    
-    if current_sync_block > chain_tip:
-         current_sync_block = chain_tip - 10
-         
-    print(f"⏩ Fast-forwarding: Skipping from {current_sync_block} to {chain_tip}...")
-    current_sync_block = chain_tip - 5
-    # --------------------------
+    window = AdaptiveWindow()
+    current_sync_block = None
 
-    print(f"📥 Indexing from block {current_sync_block}...")
+    wake = asyncio.Event()
+    subscription = None
+    if target.ws_url:
+        subscription = asyncio.create_task(watch_contract_logs(target, wake))
 
+    try:
+        while True:
+            try:
+                if current_sync_block is None:
+                    current_sync_block = await resume_block(rpc, target)
+                    logger.info("indexing_from", target=target.name, block=current_sync_block)
+
+                latest_block = await rpc.block_number()
+                observe_sync_position(target.name, current_sync_block - 1, latest_block)
+
+                if current_sync_block > latest_block:
+                    await wait_for_new_blocks(target, wake, 10)
+                    continue
+
+                await sync_blocks(rpc, target, current_sync_block, latest_block, window)
+                current_sync_block = latest_block + 1
+                await wait_for_new_blocks(target, wake, 0.5)
+
+            except ChainReorganized as e:
+                logger.warning("reorg_detected", target=target.name, error=str(e))
+                try:
+                    await rollback_reorg(rpc, target)
+                except Exception as rollback_error:
+                    logger.error("reorg_rollback_failed", target=target.name, error=str(rollback_error), exc_info=True)
+                    await asyncio.sleep(5)
+                current_sync_block = None
+
+            except Exception as e:
+                logger.error("indexer_error", target=target.name, error=str(e), exc_info=True)
+                await asyncio.sleep(5)
+                # Re-read the checkpoint: part of the span may already be committed
+                current_sync_block = None
+
+    finally:
+        # The subscription would otherwise outlive the loop on shutdown or a crash
+        if subscription:
+            subscription.cancel()
+            await asyncio.gather(subscription, return_exceptions=True)
+
+
+@asynccontextmanager
+async def leadership(target, key=LEADER_LOCK_KEY):
+    """
+    Waits for, then holds, the target's session-level advisory lock on a
+    dedicated connection. SQLite has a single writer anyway, so it is
+    always leader. Other workers pass their own `key`.
+    """
+    if indexer_engine.dialect.name != "postgresql":
+        yield None
+        return
+
+    async with indexer_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        params = {"key": key, "target": target.lock_key}
+        while not await conn.scalar(text("SELECT pg_try_advisory_lock(:key, :target)"), params):
+            logger.info("leader_standby", target=target.name, sample=True)
+            await asyncio.sleep(LEADER_CHECK_SECONDS)
+
+        logger.info("leader_acquired", target=target.name)
+        try:
+            yield conn
+        finally:
+            try:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key, :target)"), params)
+            except Exception:
+                pass
+
+async def run_target(target, throttle=None):
+    """Indexes one target only while this process holds its leadership"""
     while True:
         try:
-            latest_block = w3.eth.block_number
-            
-            if current_sync_block > latest_block:
-                await asyncio.sleep(10) 
-                continue
-
-            end_block = min(current_sync_block + 5, latest_block)
-
-            async with IndexerSession() as session:
-                lock_logs = safe_get_logs(contract.events.LockCreated, current_sync_block, end_block)
-                for event in lock_logs:
-                    await process_lock_created(session, event, w3)
-
-                withdraw_logs = safe_get_logs(contract.events.Withdrawal, current_sync_block, end_block)
-                for event in withdraw_logs:
-                    await session.execute(
-                        update(Lock).where(Lock.id == event['args']['lockId']).values(withdrawn=True)
-                    )
-                    print(f"🔓 Processed Withdrawal for Lock #{event['args']['lockId']}")
-                
-                emergency_logs = safe_get_logs(contract.events.EmergencyWithdrawal, current_sync_block, end_block)
-                for event in emergency_logs:
-                    await session.execute(
-                        update(Lock).where(Lock.id == event['args']['lockId']).values(withdrawn=True)
-                    )
-                    print(f"🚨 Processed Emergency Withdrawal for Lock #{event['args']['lockId']}")
-
-                await session.commit()
-            
-            current_sync_block = end_block + 1
-            await asyncio.sleep(0.5) 
-            
+            async with leadership(target) as lock_conn:
+                indexing = asyncio.create_task(_indexer_logic(target, throttle))
+                try:
+                    while not indexing.done():
+                        await asyncio.wait({indexing}, timeout=LEADER_CHECK_SECONDS)
+                        if lock_conn is not None and not indexing.done():
+                            # The lock dies with its connection; stop before a standby takes over
+                            await lock_conn.execute(text("SELECT 1"))
+                    return indexing.result()
+                finally:
+                    # Still inside leadership(): the task must have stopped
+                    # writing before the lock is released
+                    indexing.cancel()
+                    await asyncio.gather(indexing, return_exceptions=True)
         except Exception as e:
-            print(f"❌ Indexer Error: {e}")
-            await asyncio.sleep(5)
+            logger.error("indexer_stopped", target=target.name, error=str(e), exc_info=True)
+            await asyncio.sleep(LEADER_CHECK_SECONDS)
+
+async def run_indexer(targets=None):
+    """
+    Runs every selected target (targets.selected_targets) as its own task.
+    Targets sharing an RPC endpoint share one RPCBudget.
+    """
+    targets = selected_targets() if targets is None else targets
+    if not targets:
+        logger.error("indexer_halted", reason="no targets configured")
+        return
+
+    await migrate_on_startup(indexer_engine)
 
+    budgets = {}
+    tasks = []
+    for target in targets:
+        budget = budgets.setdefault(target.rpc_url, RPCBudget(RPC_RATE_LIMIT, RPC_BURST))
+        tasks.append(asyncio.create_task(run_target(target, budget.throttle_for(target.name))))
+    await asyncio.gather(*tasks)
 
 def start_indexer():
-    """Wrapper to run the async loop in a separate thread"""
-    asyncio.run(_indexer_logic())
+    """Entry point for the standalone worker (`python indexer.py`) or an embedded thread"""
+    asyncio.run(run_indexer())
 
 if __name__ == "__main__":
+    # Embedded indexers report through the API's /metrics instead
+    serve_metrics()
     start_indexer()
\ No newline at end of file
@@ -1,6 +1,7 @@
 import asyncio
 from database import init_db
 
+# The release step when the API and workers run with AUTO_MIGRATE=false
 if __name__ == "__main__":
     print("Creating tables...")
     asyncio.run(init_db())
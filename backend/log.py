@@ -0,0 +1,79 @@
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+# json for log shippers, text for a terminal
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Share of `sample=True` records kept, e.g. per-range indexer progress.
+# Warnings and errors are never sampled away.
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
+ROOT_LOGGER = "switch"
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event and the event's fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        fields = " ".join(f"{key}={value}" for key, value in getattr(record, "fields", {}).items())
+        line = f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} {record.name} {record.getMessage()} {fields}"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line.rstrip()
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if not getattr(record, "sampled", False) or record.levelno >= logging.WARNING:
+            return True
+        return random.random() < self.rate
+
+class EventLogger(logging.LoggerAdapter):
+    """
+    `logger.info("range_synced", start=1, end=500, sample=True)`: keyword
+    arguments become structured fields; sample=True makes the record subject
+    to LOG_SAMPLE_RATE.
+    """
+
+    RESERVED = ("exc_info", "stack_info", "stacklevel")
+
+    def process(self, msg, kwargs):
+        sampled = kwargs.pop("sample", False)
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in self.RESERVED}
+        kwargs["extra"] = {"fields": fields, "sampled": sampled}
+        return msg, kwargs
+
+def configure_logging():
+    """Installs the handler on the 'switch' logger once; uvicorn's own loggers are left alone"""
+    root = logging.getLogger(ROOT_LOGGER)
+    if root.handlers:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JSONFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    handler.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    root.propagate = False
+
+def get_logger(name):
+    configure_logging()
+    return EventLogger(logging.getLogger(f"{ROOT_LOGGER}.{name}"), {})
\ No newline at end of file
@@ -1,62 +1,97 @@
 import os
+import asyncio
+import json
+import hashlib
 import secrets
 import jwt
 from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
-from typing import List
+from typing import List, Optional
 import threading
-from indexer import start_indexer
 
-from fastapi import FastAPI, Depends, HTTPException, Body, status
+from fastapi import FastAPI, Depends, HTTPException, Body, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from web3 import Web3
-from eth_account.messages import encode_defunct
+from eth_utils import to_checksum_address, from_wei
 from dotenv import load_dotenv
 
-from database import get_db, init_db
-from models import User, Lock
+from database import get_db, get_read_db, migrate_on_startup, missing_schema, upsert, engine, read_engine, AUTO_MIGRATE, DATABASE_URL
+from signatures import signature_verifier, login_message, VerifierBusy
+from auth_cache import cache_token, cached_token_address, user_cache
+from nonce_store import nonce_store, is_unshared
+from stats import apply_stats_delta, load_platform_stats
+from cache import TTLCache
+from feed import listen_for_changes, stream_changes
+from export import export_query, event_export_query, stream_export, LOCK_EXPORT, EVENT_EXPORT, MEDIA_TYPES
+from serialization import FastJSONResponse, lock_rows_to_dicts
+from pagination import LockPageParams, fetch_lock_page, NEXT_CURSOR_HEADER
+from metrics import RequestMetricsMiddleware, render_metrics, track_pool
+from log import get_logger
+from models import User
 import schemas
 
 load_dotenv()
 
+logger = get_logger("api")
+
 JWT_SECRET = os.getenv("JWT_SECRET")
 ALGORITHM = os.getenv("ALGORITHM")
-RPC_URL = os.getenv("RPC_URL", "http://127.0.0.1:8545")
+# The indexer normally runs as its own process (`python indexer.py`).
+# Single-process hosts can opt back into running it inside the API.
+RUN_EMBEDDED_INDEXER = os.getenv("RUN_EMBEDDED_INDEXER", "false").lower() == "true"
+STATS_CACHE_SECONDS = int(os.getenv("STATS_CACHE_SECONDS", "5"))
+READINESS_TIMEOUT_SECONDS = float(os.getenv("READINESS_TIMEOUT_SECONDS", "2"))
+
+# One entry: the rendered /stats body and its ETag
+stats_cache = TTLCache(1, STATS_CACHE_SECONDS)
 
 if not JWT_SECRET:
     raise ValueError("Fatal Error: JWT_SECRET_KEY is missing in .env")
 if not ALGORITHM:
     raise ValueError("Fatal Error: ALGORITHM is missing in .env")
 
-blockchain_state = {}
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Starting Switch API...")
+    logger.info("api_starting", auto_migrate=AUTO_MIGRATE)
+    await migrate_on_startup()
 
-    print("🛠️ Checking database tables...")
-    await init_db()
-    print("✅ Database tables checked/created.")
+    if is_unshared(nonce_store):
+        logger.error("nonce_store_not_shared", hint="logins fail across API workers; set NONCE_STORE_URL")
 
-    indexer_thread = threading.Thread(target=start_indexer, daemon=True)
-    indexer_thread.start()
-    
-    w3 = Web3(Web3.HTTPProvider(RPC_URL))
-    if w3.is_connected():
-        print(f"Connected to Blockchain at {RPC_URL}")
-        blockchain_state["w3"] = w3
-    else:
-        print(f"Warning: Could not connect to Blockchain at {RPC_URL}")
+    if RUN_EMBEDDED_INDEXER:
+        # Leader election keeps this to one indexer across all workers
+        indexer_thread = threading.Thread(target=run_embedded_indexer, daemon=True)
+        indexer_thread.start()
+
+    # Spawns the signature workers now instead of on the first login
+    signature_verifier.warm_up()
+
+    # Lock changes from indexers in other processes arrive via NOTIFY
+    feed_listener = None
+    if DATABASE_URL.startswith("postgresql+asyncpg://"):
+        dsn = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+        feed_listener = asyncio.create_task(listen_for_changes(dsn))
     
     yield
-    print("Shutting down...")
-    blockchain_state.clear()
+    logger.info("api_stopping")
+    if feed_listener:
+        feed_listener.cancel()
+    signature_verifier.close()
+
+def run_embedded_indexer():
+    # Imported in the thread so web3 and the ABIs stay off the startup path
+    from indexer import start_indexer
+    start_indexer()
 
 app = FastAPI(lifespan=lifespan, title="Switch V2 API")
 
+track_pool("primary", engine)
+if read_engine is not engine:
+    track_pool("read", read_engine)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origin_regex=r"https://switch-smart-vault.*\.vercel\.app",
@@ -69,7 +104,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 
 security = HTTPBearer()
@@ -88,37 +125,44 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM or "HS256"])
-        address: str = payload.get("sub")
-        if address is None:
+    address = cached_token_address(token)
+    if address is None:
+        try:
+            payload = jwt.decode(
+                token, JWT_SECRET, algorithms=[ALGORITHM or "HS256"],
+                options={"require": ["exp", "sub"]},
+            )
+            address = payload["sub"]
+            cache_token(token, address, payload["exp"])
+        except Exception:
             raise credentials_exception
-    except Exception:
-        raise credentials_exception
-        
+
+    user = user_cache.get(address)
+    if user is not None:
+        return user
+
     result = await db.execute(select(User).where(User.address == address))
     user = result.scalars().first()
+    if user is not None:
+        # Detach so the cached row outlives this request's session
+        db.expunge(user)
+    # Return the connection to the pool now; routes reading through
+    # get_read_db would otherwise hold two per request and can starve it
+    await db.rollback()
     if user is None:
         raise credentials_exception
+    user_cache.put(address, user)
     return user
 
 # --- AUTHENTICATION ENDPOINTS ---
 
 @app.post("/auth/nonce", response_model=dict)
-async def generate_nonce(request: schemas.NonceRequest, db: AsyncSession = Depends(get_db)):
-    """User asks for a challenge (nonce)"""
+async def generate_nonce(request: schemas.NonceRequest):
+    """User asks for a challenge (nonce). Nothing is written to the database."""
     nonce = secrets.token_hex(16)
-    checksum_addr = Web3.to_checksum_address(request.address)
-    
-    result = await db.execute(select(User).where(User.address == checksum_addr))
-    user = result.scalars().first()
+    checksum_addr = to_checksum_address(request.address)
     
-    if not user:
-        user = User(address=checksum_addr)
-        db.add(user)
-    
-    user.nonce = nonce # type: ignore
-    await db.commit()
+    await nonce_store.put(checksum_addr, nonce)
     
     return {"nonce": nonce}
 
@@ -128,30 +172,32 @@ async def verify_signature(
     db: AsyncSession = Depends(get_db)
 ):
     """User submits the signed challenge"""
-    checksum_addr = Web3.to_checksum_address(request.address)
-    
-    result = await db.execute(select(User).where(User.address == checksum_addr))
-    user = result.scalars().first()
+    checksum_addr = to_checksum_address(request.address)
     
-    if not user or not user.nonce: # type: ignore
-        raise HTTPException(status_code=400, detail="Nonce not generated for this address")
+    # Single use: a failed attempt burns the challenge too
+    nonce = await nonce_store.consume(checksum_addr)
+    if not nonce:
+        raise HTTPException(status_code=400, detail="Nonce not generated for this address or expired")
     
-    message_text = f"Sign this nonce to login: {user.nonce}"
-    encoded_message = encode_defunct(text=message_text)
-    
-    w3 = blockchain_state.get("w3")
-    if not w3:
-        raise HTTPException(status_code=503, detail="Blockchain connection unavailable")
-
     try:
-        recovered_address = w3.eth.account.recover_message(encoded_message, signature=request.signature)
+        recovered_address = await signature_verifier.recover(login_message(nonce), request.signature)
+    except VerifierBusy:
+        raise HTTPException(status_code=503, detail="Too many login attempts, retry shortly", headers={"Retry-After": "1"})
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid signature format")
         
     if recovered_address != checksum_addr:
         raise HTTPException(status_code=401, detail="Signature invalid")
         
-    user.nonce = None # type: ignore
+    # The users row is only created once someone actually signs in
+    result = await db.execute(
+        upsert(db, User)
+        .on_conflict_do_nothing(index_elements=["address"])
+        .values(address=checksum_addr)
+        .returning(User.id)
+    )
+    if result.first() is not None:
+        await apply_stats_delta(db, users=1)
     await db.commit()
     
     token = create_access_token({"sub": checksum_addr})
@@ -165,49 +211,162 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
 
 # --- UPDATED LOCK ENDPOINTS ---
 
+def lock_page_response(rows, next_cursor):
+    """
+    Serializes lock rows directly. response_model on the routes below only
+    documents the shape; a returned Response bypasses its validation.
+    """
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return FastJSONResponse(lock_rows_to_dicts(rows), headers=headers)
+
 @app.get("/users/{address}/locks", response_model=List[schemas.LockResponse])
-async def get_user_locks(address: str, db: AsyncSession = Depends(get_db)):
+async def get_user_locks(
+    address: str,
+    page: LockPageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
-    Returns a clean list of locks. 
-    The 'amount' will be auto-converted to string by the schema.
+    Returns one page of an address's locks, newest first by default.
+    The 'amount' is rendered as a string, as in schemas.LockResponse.
     """
-    checksum_addr = Web3.to_checksum_address(address)
-    result = await db.execute(select(Lock).where(Lock.owner_address == checksum_addr))
-    locks = result.scalars().all()
-    return locks
+    checksum_addr = to_checksum_address(address)
+    rows, next_cursor = await fetch_lock_page(db, checksum_addr, page)
+    return lock_page_response(rows, next_cursor)
 
 @app.get("/locks", response_model=List[schemas.LockResponse])
-async def get_my_locks(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def get_my_locks(
+    page: LockPageParams = Depends(),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
-    Returns all locks belonging to the logged-in user.
+    Returns one page of the logged-in user's locks.
     """
-    result = await db.execute(select(Lock).where(Lock.owner_address == current_user.address))
-    locks = result.scalars().all()
-    
-    return locks
+    rows, next_cursor = await fetch_lock_page(db, current_user.address, page)
+    return lock_page_response(rows, next_cursor)
+
+@app.get("/users/{address}/locks/stream")
+async def stream_user_locks(address: str, request: Request):
+    """
+    Server-Sent Events with this address's lock changes as the indexer
+    commits them: lock_created (carrying the full lock), lock_withdrawn,
+    and lock_removed / lock_unwithdrawn when a reorg undoes them.
+    """
+    checksum_addr = to_checksum_address(address)
+    return StreamingResponse(
+        stream_changes(request, checksum_addr),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/export/locks")
+async def export_locks(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    from_block: Optional[int] = None,
+    to_block: Optional[int] = None,
+    created_after: Optional[int] = None,
+    created_before: Optional[int] = None,
+    chain_id: Optional[int] = None,
+):
+    """
+    Streams every lock matching the filters as NDJSON or CSV, ordered by
+    chain, contract and lock id. Block filters apply to the creating block
+    (pass chain_id with them), timestamp filters to created_at (unix seconds).
+    """
+    query = export_query(from_block, to_block, created_after, created_before, chain_id)
+    return StreamingResponse(
+        stream_export(LOCK_EXPORT, query, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="locks.{format}"'},
+    )
+
+@app.get("/export/events")
+async def export_events(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    from_block: Optional[int] = None,
+    to_block: Optional[int] = None,
+    event: Optional[str] = Query(None, pattern="^(LockCreated|Withdrawal|EmergencyWithdrawal)$"),
+    chain_id: Optional[int] = None,
+):
+    """
+    Streams the raw indexed contract events (including withdrawal amounts
+    and emergency penalties) in chain order, as NDJSON or CSV.
+    """
+    query = event_export_query(from_block, to_block, event, chain_id)
+    return StreamingResponse(
+        stream_export(EVENT_EXPORT, query, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="events.{format}"'},
+    )
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match per RFC 9110: `*`, or a list of tags compared weakly (W/ ignored)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
 
 @app.get("/stats")
-async def get_platform_stats(db: AsyncSession = Depends(get_db)):
+async def get_platform_stats(request: Request, db: AsyncSession = Depends(get_read_db)):
     """
     Returns public platform statistics for the Landing Page.
+    Reads the indexer-maintained summary row, cached for a few seconds.
     """
-    result_count = await db.execute(select(func.count(Lock.id)))
-    total_locks = result_count.scalar() or 0
+    cached = stats_cache.get("stats")
+    if cached is None:
+        stats = await load_platform_stats(db)
+        tvl_wei = int(stats.tvl_wei) if stats else 0
+        body = json.dumps({
+            "total_locks": stats.total_locks if stats else 0,
+            "tvl_eth": float(from_wei(tvl_wei, 'ether')),
+            "total_users": stats.total_users if stats else 0,
+        })
+        etag = '"' + hashlib.sha1(body.encode()).hexdigest()[:20] + '"'
+        cached = (body, etag)
+        stats_cache.put("stats", cached)
 
-    result_tvl = await db.execute(select(func.sum(Lock.amount)).where(Lock.withdrawn == False))
-    
-    tvl_wei = int(result_tvl.scalar() or 0)
-    
-    tvl_eth = Web3.from_wei(tvl_wei, 'ether')
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={STATS_CACHE_SECONDS}"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/healthz", include_in_schema=False)
+def liveness():
+    """The process is up and serving; touches nothing else"""
+    return {"status": "ok"}
+
+# Set once the schema has been seen complete; it does not regress
+schema_verified = False
 
-    result_users = await db.execute(select(func.count(User.id)))
-    total_users = result_users.scalar() or 0
+@app.get("/readyz", include_in_schema=False)
+async def readiness():
+    """
+    Ready to take traffic: the database answers and its schema is migrated
+    (with AUTO_MIGRATE=false, once `python init_db.py` has run).
+    """
+    global schema_verified
+    try:
+        # Covers the pool checkout and connect too, not only the query
+        async with asyncio.timeout(READINESS_TIMEOUT_SECONDS):
+            async with engine.connect() as conn:
+                if schema_verified:
+                    await conn.execute(select(1))
+                else:
+                    missing = await conn.run_sync(missing_schema)
+                    if missing:
+                        return FastJSONResponse({"status": "schema_outdated", "missing": missing}, status_code=503)
+                    schema_verified = True
+    except Exception as e:
+        return FastJSONResponse({"status": "database_unavailable", "error": type(e).__name__}, status_code=503)
+    return {"status": "ready"}
 
-    return {
-        "total_locks": total_locks,
-        "tvl_eth": float(tvl_eth),
-        "total_users": total_users
-    }
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape endpoint: indexer lag and stages, RPC, DB pools, route latency"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,108 @@
+import os
+import time
+
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest, start_http_server
+
+# Standalone workers (python indexer.py) serve their own /metrics on this port
+INDEXER_METRICS_PORT = int(os.getenv("INDEXER_METRICS_PORT", "0"))
+
+# --- Indexer ---
+
+# Every indexer series is labelled with the target's name (targets.py)
+INDEXER_HEAD_BLOCK = Gauge("indexer_head_block", "Last block the indexer has committed", ["target"])
+CHAIN_TIP_BLOCK = Gauge("indexer_chain_tip_block", "Latest block reported by the RPC node", ["target"])
+INDEXER_LAG_BLOCKS = Gauge("indexer_lag_blocks", "Chain tip minus indexer head", ["target"])
+
+# get_logs, get_block, db_flush (every statement of a range) and db_commit
+INDEXER_STAGE_SECONDS = Histogram(
+    "indexer_stage_seconds",
+    "Time spent per indexer stage",
+    ["target", "stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+EVENTS_INDEXED = Counter("indexer_events_total", "Contract events applied, replays included", ["target", "event"])
+INDEXER_REORGS = Counter("indexer_reorgs_total", "Chain reorganisations rolled back", ["target"])
+
+# --- Reconciler ---
+
+RECONCILE_LOCKS_CHECKED = Counter("reconcile_locks_checked_total", "Lock ids compared against on-chain state", ["target"])
+# kind: missing, withdrawn, unwithdrawn or mismatch (see reconcile.py)
+RECONCILE_DISCREPANCIES = Counter("reconcile_discrepancies_total", "Locks whose row disagreed with the chain", ["target", "kind"])
+RECONCILE_REPAIRS = Counter("reconcile_repairs_total", "Lock rows repaired", ["target", "kind"])
+
+# --- RPC ---
+
+RPC_CALLS = Counter("rpc_calls_total", "JSON-RPC requests sent, retries included", ["method"])
+RPC_ERRORS = Counter("rpc_errors_total", "JSON-RPC requests that failed", ["method"])
+
+# --- Database pools ---
+
+DB_POOL_SIZE = Gauge("db_pool_size", "Connections kept in the pool", ["pool"])
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently in use", ["pool"])
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections open beyond the pool size", ["pool"])
+
+# --- HTTP ---
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response starts, by route template",
+    ["method", "route", "status"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+def stage_timer(target, stage):
+    """`with stage_timer(target.name, "get_logs"):` records the block's duration"""
+    return INDEXER_STAGE_SECONDS.labels(target, stage).time()
+
+def observe_sync_position(target, head, tip):
+    INDEXER_HEAD_BLOCK.labels(target).set(head)
+    CHAIN_TIP_BLOCK.labels(target).set(tip)
+    INDEXER_LAG_BLOCKS.labels(target).set(max(tip - head, 0))
+
+def track_pool(name, engine):
+    """Samples a SQLAlchemy engine's pool on every scrape; no-op for pools without a size"""
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return
+    DB_POOL_SIZE.labels(name).set_function(pool.size)
+    DB_POOL_CHECKED_OUT.labels(name).set_function(pool.checkedout)
+    # overflow() counts up from -pool_size until the pool is full
+    DB_POOL_OVERFLOW.labels(name).set_function(lambda: max(pool.overflow(), 0))
+
+def render_metrics():
+    """(body, content type) in the Prometheus text format"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+def serve_metrics(port=INDEXER_METRICS_PORT):
+    """Exposes /metrics from a background thread, for processes without the API"""
+    if port:
+        start_http_server(port)
+
+class RequestMetricsMiddleware:
+    """
+    Records HTTP_REQUEST_SECONDS per route template (/users/{address}/locks,
+    not one series per address). Timing stops at the response start, so
+    streamed exports and SSE report time to first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                HTTP_REQUEST_SECONDS.labels(
+                    scope["method"],
+                    route.path if route is not None else "unmatched",
+                    message["status"],
+                ).observe(time.perf_counter() - start)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
\ No newline at end of file
@@ -1,10 +1,38 @@
-from sqlalchemy import Column, Integer, String, Boolean, BigInteger, Numeric, DateTime, ForeignKey, Text
+from decimal import Decimal
+
+from sqlalchemy import Column, Integer, String, Boolean, BigInteger, Numeric, DateTime, ForeignKey, ForeignKeyConstraint, Text, Index, JSON, false
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 Base = declarative_base()
 
+class WeiAmount(TypeDecorator):
+    """
+    uint256 wei values: NUMERIC(78, 0) on Postgres. SQLite has no exact
+    type that wide (NUMERIC keeps 64-bit integers, then floats), so there
+    they are stored as decimal strings; sums happen in Python (stats.py).
+    """
+    impl = Numeric(78, 0)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(String(78))
+        return dialect.type_descriptor(Numeric(78, 0))
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and dialect.name == "sqlite":
+            return str(int(value))
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and dialect.name == "sqlite":
+            return Decimal(value)
+        return value
+
 class User(Base):
     __tablename__ = "users"
 
@@ -17,11 +45,14 @@ class User(Base):
 class Lock(Base):
     __tablename__ = "locks"
 
+    # Lock ids are only unique within one contract on one chain
+    chain_id = Column(BigInteger, primary_key=True)
+    contract_address = Column(String(42), primary_key=True)
     id = Column(Integer, primary_key=True, index=True) 
     
-    amount = Column(Numeric(78, 0), nullable=False)
+    amount = Column(WeiAmount(), nullable=False)
     
-    unlock_timestamp = Column(BigInteger, nullable=False)
+    unlock_timestamp = Column(BigInteger, nullable=False, index=True)
     created_at = Column(BigInteger, nullable=False)
     
     goal_name = Column(String(64), nullable=True)
@@ -30,13 +61,106 @@ class Lock(Base):
     owner_address = Column(String(42), ForeignKey("users.address"), nullable=False)
     tx_hash = Column(String(66), nullable=False)
 
+    # Blocks that created / withdrew the lock, used to undo orphaned blocks
+    block_number = Column(BigInteger, nullable=True, index=True)
+    withdrawn_block = Column(BigInteger, nullable=True, index=True)
+
     owner = relationship("User", back_populates="locks")
 
+    __table_args__ = (
+        # Keyset pagination of an owner's locks by (created_at, id, chain_id, contract_address)
+        Index("ix_locks_owner_position", "owner_address", "created_at", "id", "chain_id", "contract_address"),
+        # Same order restricted to locks still holding funds
+        Index(
+            "ix_locks_owner_active_position",
+            "owner_address", "created_at", "id", "chain_id", "contract_address",
+            postgresql_where=(withdrawn == false()),
+            sqlite_where=(withdrawn == false()),
+        ),
+    )
+
 class Notification(Base):
     __tablename__ = "notifications"
 
     id = Column(Integer, primary_key=True, index=True)
-    lock_id = Column(Integer, ForeignKey("locks.id"), nullable=False)
+    chain_id = Column(BigInteger, nullable=False)
+    contract_address = Column(String(42), nullable=False)
+    lock_id = Column(Integer, nullable=False)
     email = Column(String(255), nullable=False)
     notify_before_seconds = Column(Integer, default=86400)
-    sent = Column(Boolean, default=False)
\ No newline at end of file
+    sent = Column(Boolean, default=False)
+
+    # locks.unlock_timestamp - notify_before_seconds, stored so due reminders
+    # are one index range scan instead of a join over every pending row
+    due_at = Column(BigInteger, nullable=True)
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["chain_id", "contract_address", "lock_id"],
+            ["locks.chain_id", "locks.contract_address", "locks.id"],
+        ),
+        Index(
+            "ix_notifications_pending_due",
+            "due_at",
+            postgresql_where=(sent == false()),
+            sqlite_where=(sent == false()),
+        ),
+    )
+
+class SyncCursor(Base):
+    __tablename__ = "sync_cursors"
+
+    chain_id = Column(BigInteger, primary_key=True)
+    contract_address = Column(String(42), primary_key=True)
+    last_block = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ReconcileCursor(Base):
+    """Next lock id the reconciler checks against the chain, per target"""
+    __tablename__ = "reconcile_cursors"
+
+    chain_id = Column(BigInteger, primary_key=True)
+    contract_address = Column(String(42), primary_key=True)
+    next_lock_id = Column(BigInteger, nullable=False, default=1)
+    # Full passes over every lock id completed so far
+    passes = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class IndexedBlock(Base):
+    """Hashes of recently indexed, not yet final blocks, for reorg detection"""
+    __tablename__ = "indexed_blocks"
+
+    # Per cursor: each target checks the blocks it indexed itself
+    chain_id = Column(BigInteger, primary_key=True)
+    contract_address = Column(String(42), primary_key=True)
+    number = Column(BigInteger, primary_key=True)
+    hash = Column(String(66), nullable=False)
+    parent_hash = Column(String(66), nullable=True)
+
+class PlatformStats(Base):
+    """Single-row running totals behind /stats, kept current by the indexer"""
+    __tablename__ = "platform_stats"
+
+    id = Column(Integer, primary_key=True)
+    total_locks = Column(BigInteger, nullable=False, default=0)
+    tvl_wei = Column(WeiAmount(), nullable=False, default=0)
+    total_users = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ChainEvent(Base):
+    """
+    Append-only log of every decoded contract event. locks, users and
+    platform_stats are projections of it (see projections.py).
+    """
+    __tablename__ = "chain_events"
+
+    chain_id = Column(BigInteger, primary_key=True)
+    block_number = Column(BigInteger, primary_key=True)
+    log_index = Column(Integer, primary_key=True)
+    contract_address = Column(String(42), nullable=False)
+    event = Column(String(32), nullable=False, index=True)
+    lock_id = Column(BigInteger, nullable=True, index=True)
+    # Decoded args; uint256 values are stored as decimal strings
+    args = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
+    block_timestamp = Column(BigInteger, nullable=True)
+    tx_hash = Column(String(66), nullable=False)
\ No newline at end of file
@@ -0,0 +1,116 @@
+import multiprocessing
+import os
+import time
+from abc import ABC, abstractmethod
+
+# Login challenges live outside Postgres. The in-memory store is fine for a
+# single API process; run several workers or hosts against Redis instead.
+NONCE_TTL_SECONDS = int(os.getenv("NONCE_TTL_SECONDS", "300"))
+NONCE_STORE_URL = os.getenv("NONCE_STORE_URL")
+MEMORY_NONCE_LIMIT = int(os.getenv("MEMORY_NONCE_LIMIT", "100000"))
+# uvicorn and gunicorn both take their default worker count from here
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+
+class NonceStore(ABC):
+    """Single-use login challenges that expire"""
+
+    @abstractmethod
+    async def put(self, address, nonce, ttl=NONCE_TTL_SECONDS):
+        ...
+
+    @abstractmethod
+    async def consume(self, address):
+        """Returns the pending nonce and deletes it in one step, or None"""
+
+
+class MemoryNonceStore(NonceStore):
+    def __init__(self, limit=MEMORY_NONCE_LIMIT):
+        self.limit = limit
+        self._nonces = {}
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        for address in [a for a, (_, expires_at) in self._nonces.items() if expires_at <= now]:
+            del self._nonces[address]
+
+    async def put(self, address, nonce, ttl=NONCE_TTL_SECONDS):
+        if len(self._nonces) >= self.limit:
+            self._purge_expired()
+            if len(self._nonces) >= self.limit:
+                # Still full of live challenges: drop the oldest
+                del self._nonces[next(iter(self._nonces))]
+        self._nonces.pop(address, None)
+        self._nonces[address] = (nonce, time.monotonic() + ttl)
+
+    async def consume(self, address):
+        # No await between lookup and delete, so this is atomic on the loop
+        entry = self._nonces.pop(address, None)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+
+class RedisNonceStore(NonceStore):
+    """Works with any client offering redis.asyncio's `set(..., ex=)` and `getdel`"""
+
+    def __init__(self, client, prefix="switch:nonce:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def put(self, address, nonce, ttl=NONCE_TTL_SECONDS):
+        await self.client.set(self.prefix + address, nonce, ex=ttl)
+
+    async def consume(self, address):
+        value = await self.client.getdel(self.prefix + address)
+        if isinstance(value, bytes):
+            value = value.decode()
+        return value
+
+
+class FakeRedis:
+    """In-process stand-in for the subset of redis.asyncio.Redis used above"""
+
+    def __init__(self):
+        self._data = {}
+
+    async def set(self, name, value, ex=None):
+        expires_at = time.monotonic() + ex if ex else None
+        self._data[name] = (str(value).encode(), expires_at)
+        return True
+
+    async def getdel(self, name):
+        entry = self._data.pop(name, None)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            return None
+        return value
+
+
+def create_nonce_store(url=NONCE_STORE_URL, workers=WEB_CONCURRENCY):
+    """`redis://...` for a shared store, `fake://` for the local fake, unset for memory"""
+    if not url:
+        if workers > 1:
+            # A challenge issued by one worker could not be verified by another
+            raise ValueError("NONCE_STORE_URL is required when running more than one API worker")
+        return MemoryNonceStore()
+    if url.startswith("fake://"):
+        return RedisNonceStore(FakeRedis())
+    try:
+        import redis.asyncio as redis
+    except ImportError:
+        raise ValueError("NONCE_STORE_URL points at Redis but the 'redis' package is not installed")
+    return RedisNonceStore(redis.from_url(url))
+
+
+def is_unshared(store):
+    """
+    True for the in-memory store inside a spawned worker process, e.g. under
+    `uvicorn --workers N`, which does not export N (or under --reload)
+    """
+    return isinstance(store, MemoryNonceStore) and multiprocessing.parent_process() is not None
+
+
+nonce_store = create_nonce_store()
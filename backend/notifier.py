@@ -0,0 +1,207 @@
+import asyncio
+import json
+from abc import ABC, abstractmethod
+import os
+import smtplib
+import time
+from email.message import EmailMessage
+
+from sqlalchemy import select, update, false
+from dotenv import load_dotenv
+
+from database import async_session, migrate_on_startup
+from models import Lock, Notification
+from log import get_logger
+
+load_dotenv()
+
+logger = get_logger("notifier")
+
+NOTIFIER_POLL_SECONDS = int(os.getenv("NOTIFIER_POLL_SECONDS", "30"))
+NOTIFIER_BATCH_SIZE = int(os.getenv("NOTIFIER_BATCH_SIZE", "200"))
+# "file" appends JSON lines to NOTIFICATION_OUTBOX; "smtp" talks to SMTP_HOST
+NOTIFICATION_SENDER = os.getenv("NOTIFICATION_SENDER", "file")
+NOTIFICATION_OUTBOX = os.getenv("NOTIFICATION_OUTBOX", "notifications.jsonl")
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "1025"))
+SMTP_FROM = os.getenv("SMTP_FROM", "reminders@switch.local")
+
+_local_batch_lock = asyncio.Lock()
+
+
+class NotificationSender(ABC):
+    """Delivers a batch of reminders; raising leaves the whole batch unsent"""
+
+    @abstractmethod
+    async def send(self, reminders):
+        ...
+
+
+class FileSender(NotificationSender):
+    """Appends one JSON line per reminder; for local runs and tests"""
+
+    def __init__(self, path):
+        self.path = path
+
+    async def send(self, reminders):
+        lines = "".join(json.dumps(reminder) + "\n" for reminder in reminders)
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines):
+        with open(self.path, "a") as f:
+            f.write(lines)
+
+
+class SMTPSender(NotificationSender):
+    """
+    Plain SMTP, one connection per batch. Defaults to localhost:1025 so a
+    local debugging server (`python -m aiosmtpd -n`) can stand in.
+    """
+
+    def __init__(self, host, port, sender):
+        self.host = host
+        self.port = port
+        self.sender = sender
+
+    async def send(self, reminders):
+        await asyncio.to_thread(self._send_all, reminders)
+
+    def _send_all(self, reminders):
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            for reminder in reminders:
+                smtp.send_message(self._message(reminder))
+
+    def _message(self, reminder):
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = reminder["email"]
+        message["Subject"] = f"Your Switch lock \"{reminder['goal_name']}\" unlocks soon"
+        unlock_at = time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime(reminder["unlock_timestamp"]))
+        message.set_content(f"Lock #{reminder['lock_id']} can be withdrawn from {unlock_at}.")
+        return message
+
+
+def create_sender(name=NOTIFICATION_SENDER):
+    if name == "file":
+        return FileSender(NOTIFICATION_OUTBOX)
+    if name == "smtp":
+        return SMTPSender(SMTP_HOST, SMTP_PORT, SMTP_FROM)
+    raise ValueError(f"Unknown NOTIFICATION_SENDER: {name}")
+
+
+async def fill_due_times(session):
+    """Computes due_at for reminders created without it"""
+    unlock_timestamp = (
+        select(Lock.unlock_timestamp)
+        .where(
+            Lock.chain_id == Notification.chain_id,
+            Lock.contract_address == Notification.contract_address,
+            Lock.id == Notification.lock_id,
+        )
+        .scalar_subquery()
+    )
+    await session.execute(
+        update(Notification)
+        .where(Notification.due_at.is_(None), Notification.sent == false())
+        .values(due_at=unlock_timestamp - Notification.notify_before_seconds)
+    )
+
+
+async def claim_due(session, now, limit):
+    """
+    Locks up to `limit` due, unsent reminders for this transaction. SKIP
+    LOCKED lets other workers claim the next rows instead of waiting or
+    sending the same ones.
+    """
+    query = (
+        select(
+            Notification.id,
+            Notification.email,
+            Notification.chain_id,
+            Notification.contract_address,
+            Notification.lock_id,
+            Lock.goal_name,
+            Lock.unlock_timestamp,
+            Lock.withdrawn,
+        )
+        .join(Lock, (Lock.chain_id == Notification.chain_id)
+              & (Lock.contract_address == Notification.contract_address)
+              & (Lock.id == Notification.lock_id))
+        .where(Notification.sent == false(), Notification.due_at <= now)
+        .order_by(Notification.due_at)
+        .limit(limit)
+    )
+    if session.bind.dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True, of=Notification)
+    result = await session.execute(query)
+    return result.all()
+
+
+async def process_batch(sender, now=None):
+    """
+    Claims, delivers and marks one batch in a single transaction, so a
+    failed delivery releases the rows for a retry. Returns the number of
+    reminders claimed.
+    """
+    now = int(time.time()) if now is None else now
+    async with async_session() as session:
+        if session.bind.dialect.name == "postgresql":
+            return await _process_batch(session, sender, now)
+        # No row locks elsewhere (SQLite): serialize batches in this process
+        async with _local_batch_lock:
+            return await _process_batch(session, sender, now)
+
+
+async def _process_batch(session, sender, now):
+    async with session.begin():
+        rows = await claim_due(session, now, NOTIFIER_BATCH_SIZE)
+        if not rows:
+            return 0
+
+        # Already withdrawn locks need no reminder, just closing out
+        reminders = [
+            {
+                "notification_id": row.id,
+                "email": row.email,
+                "chain_id": row.chain_id,
+                "contract_address": row.contract_address,
+                "lock_id": row.lock_id,
+                "goal_name": row.goal_name,
+                "unlock_timestamp": row.unlock_timestamp,
+            }
+            for row in rows
+            if not row.withdrawn
+        ]
+        if reminders:
+            await sender.send(reminders)
+
+        await session.execute(
+            update(Notification)
+            .where(Notification.id.in_([row.id for row in rows]))
+            .values(sent=True)
+        )
+
+    logger.info("reminders_sent", sent=len(reminders), skipped=len(rows) - len(reminders), sample=True)
+    return len(rows)
+
+
+async def run_notifier(sender=None):
+    """Drains due reminders every NOTIFIER_POLL_SECONDS; on Postgres several copies share the load"""
+    sender = sender or create_sender()
+    await migrate_on_startup()
+
+    logger.info("notifier_started", sender=type(sender).__name__)
+    while True:
+        try:
+            async with async_session() as session:
+                async with session.begin():
+                    await fill_due_times(session)
+            while await process_batch(sender) == NOTIFIER_BATCH_SIZE:
+                pass
+        except Exception as e:
+            logger.error("notifier_error", error=str(e), exc_info=True)
+        await asyncio.sleep(NOTIFIER_POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_notifier())
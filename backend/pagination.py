@@ -0,0 +1,93 @@
+import base64
+import json
+import os
+from typing import Optional
+
+from fastapi import HTTPException, Query
+from sqlalchemy import select, tuple_, true, false
+
+from models import Lock
+from serialization import LOCK_RESPONSE_COLUMNS
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+# The list body stays a plain JSON array; the next page is advertised here
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(lock):
+    """Opaque token for the (created_at, id, chain_id, contract_address) position after `lock`"""
+    raw = json.dumps([lock.created_at, lock.id, lock.chain_id, lock.contract_address]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, lock_id, chain_id, contract_address = json.loads(base64.urlsafe_b64decode(padded))
+        return int(created_at), int(lock_id), int(chain_id), str(contract_address)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+class LockPageParams:
+    """Query parameters shared by the lock listing endpoints"""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"),
+        order: str = Query("desc", pattern="^(asc|desc)$"),
+        withdrawn: Optional[bool] = None,
+        chain_id: Optional[int] = None,
+        unlocked_before: Optional[int] = Query(None, description="Unlock timestamp strictly before this (unix seconds)"),
+        unlocked_after: Optional[int] = Query(None, description="Unlock timestamp at or after this (unix seconds)"),
+    ):
+        self.limit = limit
+        self.cursor = decode_cursor(cursor) if cursor else None
+        self.order = order
+        self.withdrawn = withdrawn
+        self.chain_id = chain_id
+        self.unlocked_before = unlocked_before
+        self.unlocked_after = unlocked_after
+
+async def fetch_lock_page(db, owner_address, params):
+    """
+    One page of an owner's locks as LOCK_RESPONSE_COLUMNS rows in
+    (created_at, id, chain_id, contract_address) order, plus the cursor for
+    the next page (None on the last one). Seeks past the cursor instead of
+    using OFFSET, so every page costs the same index range scan.
+    """
+    # Lock ids repeat across contracts, so the contract breaks ties
+    position = tuple_(Lock.created_at, Lock.id, Lock.chain_id, Lock.contract_address)
+    query = select(*LOCK_RESPONSE_COLUMNS).where(Lock.owner_address == owner_address)
+
+    if params.withdrawn is not None:
+        # A literal, not a bind parameter, so Postgres can match the partial index
+        query = query.where(Lock.withdrawn == (true() if params.withdrawn else false()))
+    if params.chain_id is not None:
+        query = query.where(Lock.chain_id == params.chain_id)
+    if params.unlocked_before is not None:
+        query = query.where(Lock.unlock_timestamp < params.unlocked_before)
+    if params.unlocked_after is not None:
+        query = query.where(Lock.unlock_timestamp >= params.unlocked_after)
+
+    if params.order == "desc":
+        if params.cursor:
+            query = query.where(position < params.cursor)
+        query = query.order_by(
+            Lock.created_at.desc(), Lock.id.desc(), Lock.chain_id.desc(), Lock.contract_address.desc()
+        )
+    else:
+        if params.cursor:
+            query = query.where(position > params.cursor)
+        query = query.order_by(
+            Lock.created_at.asc(), Lock.id.asc(), Lock.chain_id.asc(), Lock.contract_address.asc()
+        )
+
+    # One extra row tells us whether another page exists
+    result = await db.execute(query.limit(params.limit + 1))
+    locks = result.all()
+
+    if len(locks) > params.limit:
+        locks = locks[:params.limit]
+        return locks, encode_cursor(locks[-1])
+    return locks, None
\ No newline at end of file
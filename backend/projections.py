@@ -0,0 +1,279 @@
+import asyncio
+import os
+from decimal import Decimal
+
+from web3 import Web3
+from sqlalchemy import select, update, case, exists, func, bindparam, any_, Integer, text
+from sqlalchemy.dialects import postgresql
+
+from models import User, Lock, ChainEvent
+from database import engine, async_session, create_schema, upsert
+from auth_cache import invalidate_user
+from stats import apply_stats_delta, recompute_platform_stats
+from log import get_logger
+
+logger = get_logger("projections")
+
+# Events replayed per batch when rebuilding from chain_events
+PROJECTION_BATCH_SIZE = int(os.getenv("PROJECTION_BATCH_SIZE", "5000"))
+
+def event_args(args):
+    """Decoded log args as JSON-safe values; uint256 become decimal strings"""
+    return {
+        name: str(value) if isinstance(value, int) and not isinstance(value, bool) else value
+        for name, value in dict(args).items()
+    }
+
+def event_row(chain_id, contract_address, event, block_timestamp):
+    """chain_events row for one decoded web3 log"""
+    return {
+        "chain_id": chain_id,
+        "block_number": event['blockNumber'],
+        "log_index": event['logIndex'],
+        "contract_address": contract_address,
+        "event": event['event'],
+        "lock_id": event['args'].get('lockId'),
+        "args": event_args(event['args']),
+        "block_timestamp": block_timestamp,
+        "tx_hash": Web3.to_hex(event['transactionHash']),
+    }
+
+def lock_id_in(session, lock_ids):
+    """`id = ANY(:ids)` on Postgres (one array parameter), plain IN elsewhere"""
+    if session.bind.dialect.name == "postgresql":
+        return Lock.id == any_(bindparam("lock_ids", lock_ids, type_=postgresql.ARRAY(Integer)))
+    return Lock.id.in_(lock_ids)
+
+def lock_change(change_type, chain_id, contract_address, lock_id, owner_address, block_number):
+    return {
+        "type": change_type,
+        "chain_id": chain_id,
+        "contract_address": contract_address,
+        "lock_id": lock_id,
+        "owner_address": owner_address,
+        "block_number": block_number,
+    }
+
+def lock_created_change(row):
+    change = lock_change(
+        "lock_created", row["chain_id"], row["contract_address"], row["id"], row["owner_address"], row["block_number"]
+    )
+    # Same shape as an item of GET /users/{address}/locks
+    change["lock"] = {
+        "chain_id": row["chain_id"],
+        "contract_address": row["contract_address"],
+        "goal_name": row["goal_name"],
+        "unlock_timestamp": row["unlock_timestamp"],
+        "amount": str(int(row["amount"])),
+        "id": row["id"],
+        "created_at": row["created_at"],
+        "withdrawn": False,
+        "owner_address": row["owner_address"],
+        "tx_hash": row["tx_hash"],
+    }
+    return change
+
+class RangeWriter:
+    """
+    Projects a batch of chain_events rows (of any chains and contracts) onto
+    users, locks and the platform stats with a few set-based statements
+    instead of a round-trip per event.
+    Every statement is idempotent, so replaying a range after a crash is
+    harmless.
+
+    The indexer uses it live (record_events=True also appends the raw
+    events); rebuild_projections replays stored events with rebuild=True,
+    which overwrites existing locks and leaves the stats to a recompute.
+    """
+
+    def __init__(self, record_events=True, rebuild=False):
+        self.record_events = record_events
+        self.rebuild = rebuild
+        self.events = []
+        self.users = {}
+        self.locks = []
+        # (chain_id, contract_address) -> {lock id: withdrawal block}
+        self.withdrawals = {}
+        # What this range actually changed, for the live feed
+        self.changes = []
+
+    def add(self, row):
+        self.events.append(row)
+        EVENT_HANDLERS[row['event']](self, row)
+
+    def add_lock_created(self, row):
+        args = row['args']
+        self.users[args['user']] = None
+        self.locks.append({
+            "chain_id": row['chain_id'],
+            "contract_address": row['contract_address'],
+            "id": int(args['lockId']),
+            "owner_address": args['user'],
+            "amount": Decimal(args['amount']),
+            "unlock_timestamp": int(args['unlockTimestamp']),
+            "created_at": row['block_timestamp'],
+            "block_number": row['block_number'],
+            "goal_name": args['goalName'],
+            "withdrawn": False,
+            "tx_hash": row['tx_hash'],
+        })
+
+    def add_withdrawal(self, row):
+        contract = (row['chain_id'], row['contract_address'])
+        self.withdrawals.setdefault(contract, {})[int(row['args']['lockId'])] = row['block_number']
+
+    async def flush(self, session):
+        new_users = new_locks = 0
+        tvl_delta = 0
+
+        if self.record_events and self.events:
+            await session.execute(
+                upsert(session, ChainEvent)
+                .on_conflict_do_nothing(index_elements=["chain_id", "block_number", "log_index"]),
+                self.events,
+            )
+
+        # RETURNING only yields rows actually inserted or changed, so replayed
+        # ranges leave the platform stats untouched
+        if self.users:
+            result = await session.execute(
+                upsert(session, User)
+                .on_conflict_do_nothing(index_elements=["address"])
+                .returning(User.id),
+                [{"address": address} for address in self.users],
+            )
+            new_users = len(result.all())
+            # Matters when the indexer is embedded in the API process
+            for address in self.users:
+                invalidate_user(address)
+
+        if self.locks:
+            key = ["chain_id", "contract_address", "id"]
+            stmt = upsert(session, Lock)
+            if self.rebuild:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=key,
+                    set_={
+                        column: stmt.excluded[column]
+                        for column in self.locks[0] if column not in key
+                    },
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=key)
+            result = await session.execute(
+                stmt.returning(Lock.chain_id, Lock.contract_address, Lock.id, Lock.amount), self.locks
+            )
+            inserted = result.all()
+            new_locks = len(inserted)
+            tvl_delta += sum(int(row.amount) for row in inserted)
+
+            rows_by_key = {(row["chain_id"], row["contract_address"], row["id"]): row for row in self.locks}
+            for chain_id, contract_address, lock_id, _ in inserted:
+                self.changes.append(lock_created_change(rows_by_key[(chain_id, contract_address, lock_id)]))
+
+        # Locks created earlier in this range are already inserted above,
+        # so applying every withdrawal last preserves chain order
+        for (chain_id, contract_address), blocks in self.withdrawals.items():
+            result = await session.execute(
+                update(Lock)
+                .where(
+                    Lock.chain_id == chain_id,
+                    Lock.contract_address == contract_address,
+                    lock_id_in(session, list(blocks)),
+                    Lock.withdrawn == False,
+                )
+                .values(withdrawn=True, withdrawn_block=case(blocks, value=Lock.id))
+                .returning(Lock.id, Lock.owner_address, Lock.amount, Lock.withdrawn_block)
+            )
+            for lock_id, owner_address, amount, withdrawn_block in result.all():
+                tvl_delta -= int(amount)
+                self.changes.append(
+                    lock_change("lock_withdrawn", chain_id, contract_address, lock_id, owner_address, withdrawn_block)
+                )
+
+        if not self.rebuild:
+            await apply_stats_delta(session, locks=new_locks, tvl_wei=tvl_delta, users=new_users)
+
+            if self.locks or self.withdrawals:
+                logger.info("range_projected", locks=len(self.locks), withdrawals=len(self.withdrawals), sample=True)
+
+EVENT_HANDLERS = {
+    "LockCreated": RangeWriter.add_lock_created,
+    "Withdrawal": RangeWriter.add_withdrawal,
+    "EmergencyWithdrawal": RangeWriter.add_withdrawal,
+}
+
+EVENT_COLUMNS = (
+    ChainEvent.chain_id,
+    ChainEvent.contract_address,
+    ChainEvent.block_number,
+    ChainEvent.log_index,
+    ChainEvent.event,
+    ChainEvent.args,
+    ChainEvent.block_timestamp,
+    ChainEvent.tx_hash,
+)
+
+async def rebuild_projections(batch_size=PROJECTION_BATCH_SIZE):
+    """
+    Rebuilds locks, users and platform stats from chain_events alone, with
+    no RPC calls, in one transaction: readers keep seeing the old
+    projection until it commits. Refuses to run while an indexer holds
+    leadership of any configured target, since it would race the live writer,
+    and while any lock lacks its LockCreated event. Never deletes rows.
+    """
+    from indexer import LEADER_LOCK_KEY
+    from targets import load_targets
+
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+
+    async with async_session() as session:
+        async with session.begin():
+            if session.bind.dialect.name == "postgresql":
+                for target in load_targets():
+                    acquired = await session.scalar(
+                        text("SELECT pg_try_advisory_xact_lock(:key, :target)"),
+                        {"key": LEADER_LOCK_KEY, "target": target.lock_key},
+                    )
+                    if not acquired:
+                        raise RuntimeError(f"An indexer is running {target.name}; stop it before rebuilding projections")
+
+            # A lock with no LockCreated event (e.g. indexed before chain_events
+            # existed) cannot be rebuilt, and dropping it would lose the lock
+            # and its reminders, so the events have to be backfilled first
+            created = exists().where(
+                ChainEvent.event == "LockCreated",
+                ChainEvent.chain_id == Lock.chain_id,
+                ChainEvent.contract_address == Lock.contract_address,
+                ChainEvent.lock_id == Lock.id,
+            )
+            unbacked = await session.scalar(select(func.count()).select_from(Lock).where(~created))
+            if unbacked:
+                raise RuntimeError(
+                    f"{unbacked} locks have no LockCreated event in chain_events; "
+                    "re-index from the start block to backfill them before rebuilding"
+                )
+
+            await session.execute(update(Lock).values(withdrawn=False, withdrawn_block=None))
+
+            replayed = 0
+            result = await session.stream(
+                select(*EVENT_COLUMNS)
+                .order_by(ChainEvent.chain_id, ChainEvent.block_number, ChainEvent.log_index)
+                .execution_options(yield_per=batch_size)
+            )
+            async for rows in result.partitions():
+                writer = RangeWriter(record_events=False, rebuild=True)
+                for row in rows:
+                    writer.add(row._asdict())
+                await writer.flush(session)
+                replayed += len(rows)
+
+            await session.run_sync(lambda sync_session: recompute_platform_stats(sync_session.connection()))
+
+    logger.info("projections_rebuilt", events=replayed)
+    return replayed
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_projections())
\ No newline at end of file
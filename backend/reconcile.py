@@ -0,0 +1,327 @@
+import asyncio
+import os
+from datetime import datetime
+
+from eth_abi import decode, encode
+from web3 import Web3
+from sqlalchemy import select, update, delete, or_
+from dotenv import load_dotenv
+
+from models import Lock, ChainEvent, ReconcileCursor
+from database import migrate_on_startup, upsert
+from rpc import RPCClient, RPCBudget
+from stats import apply_stats_delta
+from feed import publish_changes
+from projections import RangeWriter, event_row, lock_change, lock_id_in
+from metrics import serve_metrics, RECONCILE_LOCKS_CHECKED, RECONCILE_DISCREPANCIES, RECONCILE_REPAIRS
+from indexer import (
+    indexer_engine, IndexerSession, AdaptiveWindow, CONFIRMATIONS, block_timestamps,
+    get_contract, fetch_logs_adaptive, indexed_by, leadership, load_sync_cursor,
+)
+from log import get_logger
+from targets import selected_targets
+
+load_dotenv()
+
+logger = get_logger("reconcile")
+
+# Lock ids read per eth_call; each locks() read costs ~20k gas of the
+# node's eth_call gas cap
+RECONCILE_BATCH_SIZE = int(os.getenv("RECONCILE_BATCH_SIZE", "200"))
+# Requests per second per RPC endpoint, so a pass can run next to the
+# indexer in production; 0 means unlimited
+RECONCILE_RPC_RATE_LIMIT = float(os.getenv("RECONCILE_RPC_RATE_LIMIT", "2"))
+# Pause between full passes over every lock id
+RECONCILE_PASS_INTERVAL_SECONDS = int(os.getenv("RECONCILE_PASS_INTERVAL_SECONDS", "3600"))
+# false only reports discrepancies (logs and metrics)
+RECONCILE_REPAIR = os.getenv("RECONCILE_REPAIR", "true").lower() == "true"
+RECONCILE_LOCK_KEY = int(os.getenv("RECONCILE_LOCK_KEY", "7240118"))
+RECONCILE_METRICS_PORT = int(os.getenv("RECONCILE_METRICS_PORT", "0"))
+
+# Deployed at the same address on most EVM chains. Where it is missing
+# (local dev chains) the reads fall back to a JSON-RPC batch of eth_calls.
+MULTICALL3_ADDRESS = Web3.to_checksum_address(os.getenv("MULTICALL3_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11"))
+AGGREGATE3_SELECTOR = bytes(Web3.keccak(text="aggregate3((address,bool,bytes)[])"))[:4]
+
+# Lock ids to look up per eth_getLogs topic1 OR-list when repairing
+REPAIR_LOG_CHUNK = 100
+
+WITHDRAWAL_EVENTS = ("Withdrawal", "EmergencyWithdrawal")
+
+
+class ContractReader:
+    """Encodes and decodes SwitchV2's lockIdCounter() and locks(id) calls from the target's ABI"""
+
+    def __init__(self, abi):
+        functions = {item["name"]: item for item in abi if item.get("type") == "function"}
+        if "locks" not in functions or "lockIdCounter" not in functions:
+            raise ValueError("ABI lacks locks() or lockIdCounter()")
+        self.lock_fields = [output["name"] for output in functions["locks"]["outputs"]]
+        self.lock_types = [output["type"] for output in functions["locks"]["outputs"]]
+        self.locks_selector = bytes(Web3.keccak(text="locks(uint256)"))[:4]
+        self.counter_selector = bytes(Web3.keccak(text="lockIdCounter()"))[:4]
+
+    def locks_call(self, lock_id):
+        return self.locks_selector + encode(["uint256"], [lock_id])
+
+    def decode_lock(self, data):
+        return dict(zip(self.lock_fields, decode(self.lock_types, bytes(data))))
+
+    def decode_counter(self, data):
+        return decode(["uint256"], bytes(data))[0]
+
+
+async def read_chain(rpc, target, reader, lock_ids, block, multicall):
+    """
+    lockIdCounter and locks(id) for `lock_ids` at `block`: one Multicall3
+    aggregate3 eth_call, or a JSON-RPC batch of plain eth_calls.
+    """
+    calls = [reader.counter_selector] + [reader.locks_call(lock_id) for lock_id in lock_ids]
+    if multicall:
+        data = AGGREGATE3_SELECTOR + encode(
+            ["(address,bool,bytes)[]"], [[(target.address, False, call) for call in calls]]
+        )
+        raw = await rpc.eth_call({"to": MULTICALL3_ADDRESS, "data": Web3.to_hex(data)}, block)
+        results = [result for _, result in decode(["(bool,bytes)[]"], bytes(raw))[0]]
+    else:
+        results = await rpc.eth_calls(
+            [{"to": target.address, "data": Web3.to_hex(call)} for call in calls], block
+        )
+
+    counter = reader.decode_counter(results[0])
+    # Ids at or past the counter do not exist yet at this block
+    chain = {
+        lock_id: reader.decode_lock(result)
+        for lock_id, result in zip(lock_ids, results[1:]) if lock_id < counter
+    }
+    return counter, chain
+
+
+def diff_locks(chain, rows, block):
+    """
+    Lock ids per kind of discrepancy between on-chain state at `block` and
+    the stored rows:
+    - missing: no row
+    - withdrawn: withdrawn on chain, not in the row
+    - unwithdrawn: withdrawn in the row (by `block`), not on chain
+    - mismatch: owner, amount or unlock time differ; reported, never repaired
+    """
+    stored = {row.id: row for row in rows}
+    found = {"missing": [], "withdrawn": [], "unwithdrawn": [], "mismatch": []}
+    for lock_id, lock in chain.items():
+        row = stored.get(lock_id)
+        if row is None:
+            found["missing"].append(lock_id)
+            continue
+        if (
+            row.owner_address != Web3.to_checksum_address(lock["user"])
+            or int(row.amount) != lock["amount"]
+            or row.unlock_timestamp != lock["unlockTimestamp"]
+        ):
+            found["mismatch"].append(lock_id)
+        # Withdrawals indexed after `block` are not visible on chain yet
+        withdrawn = row.withdrawn and (row.withdrawn_block is None or row.withdrawn_block <= block)
+        if lock["withdrawn"] and not withdrawn:
+            found["withdrawn"].append(lock_id)
+        elif withdrawn and not lock["withdrawn"]:
+            found["unwithdrawn"].append(lock_id)
+    return found
+
+
+async def fetch_lock_events(rpc, target, lock_ids, block):
+    """The LockCreated and withdrawal events of `lock_ids` up to `block`, as chain_events rows"""
+    start = target.start_block if target.start_block <= block else 0
+    events = []
+    for i in range(0, len(lock_ids), REPAIR_LOG_CHUNK):
+        chunk = lock_ids[i:i + REPAIR_LOG_CHUNK]
+        events += await fetch_logs_adaptive(rpc, target, start, block, AdaptiveWindow(), chunk)
+    return [
+        event_row(target.chain_id, target.address, event, block_timestamps.get((target.chain_id, event['blockNumber'])))
+        for event in events
+    ]
+
+
+async def unwithdraw(session, target, lock_ids, block):
+    """Clears withdrawals the chain does not have, with their stored events"""
+    result = await session.execute(
+        update(Lock)
+        .where(
+            *indexed_by(Lock, target),
+            lock_id_in(session, lock_ids),
+            Lock.withdrawn == True,
+            or_(Lock.withdrawn_block == None, Lock.withdrawn_block <= block),
+        )
+        .values(withdrawn=False, withdrawn_block=None)
+        .returning(Lock.id, Lock.owner_address, Lock.amount)
+    )
+    rows = result.all()
+    await session.execute(delete(ChainEvent).where(
+        *indexed_by(ChainEvent, target),
+        ChainEvent.event.in_(WITHDRAWAL_EVENTS),
+        ChainEvent.lock_id.in_(lock_ids),
+        ChainEvent.block_number <= block,
+    ))
+    await apply_stats_delta(session, tvl_wei=sum(int(row.amount) for row in rows))
+    return [
+        lock_change("lock_unwithdrawn", target.chain_id, target.address, row.id, row.owner_address, block)
+        for row in rows
+    ]
+
+
+async def load_cursor(session, target):
+    cursor = await session.get(ReconcileCursor, (target.chain_id, target.address))
+    return (cursor.next_lock_id, cursor.passes) if cursor else (1, 0)
+
+
+async def save_cursor(session, target, next_lock_id, passes):
+    stmt = upsert(session, ReconcileCursor).values(
+        chain_id=target.chain_id,
+        contract_address=target.address,
+        next_lock_id=next_lock_id,
+        passes=passes,
+        updated_at=datetime.utcnow(),
+    )
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=["chain_id", "contract_address"],
+        set_={
+            "next_lock_id": stmt.excluded.next_lock_id,
+            "passes": stmt.excluded.passes,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ))
+
+
+async def reconcile_batch(rpc, target, reader, multicall):
+    """
+    Checks the next RECONCILE_BATCH_SIZE lock ids from the cursor and repairs
+    them. Returns the discrepancies found, or None once the pass is over.
+    """
+    async with IndexerSession() as session:
+        next_lock_id, passes = await load_cursor(session, target)
+        indexed_block = await load_sync_cursor(session, target)
+    if indexed_block is None:
+        return None
+
+    # Only compare state the indexer has already committed, and that is final
+    block = min(indexed_block, await rpc.block_number() - CONFIRMATIONS)
+    lock_ids = list(range(next_lock_id, next_lock_id + RECONCILE_BATCH_SIZE))
+    counter, chain = await read_chain(rpc, target, reader, lock_ids, block, multicall)
+
+    async with IndexerSession() as session:
+        result = await session.execute(
+            select(Lock.id, Lock.owner_address, Lock.amount, Lock.unlock_timestamp, Lock.withdrawn, Lock.withdrawn_block)
+            .where(*indexed_by(Lock, target), Lock.id.between(lock_ids[0], lock_ids[-1]))
+        )
+        found = diff_locks(chain, result.all(), block)
+
+    RECONCILE_LOCKS_CHECKED.labels(target.name).inc(len(chain))
+    for kind, ids in found.items():
+        if ids:
+            RECONCILE_DISCREPANCIES.labels(target.name, kind).inc(len(ids))
+            logger.warning("reconcile_discrepancy", target=target.name, kind=kind, lock_ids=ids, block=block)
+
+    repair = RECONCILE_REPAIR and (found["missing"] or found["withdrawn"] or found["unwithdrawn"])
+    events = []
+    if repair and (found["missing"] or found["withdrawn"]):
+        events = await fetch_lock_events(rpc, target, found["missing"] + found["withdrawn"], block)
+
+    done = next_lock_id + RECONCILE_BATCH_SIZE >= counter
+    async with IndexerSession() as session:
+        if repair:
+            # The same idempotent writes as the indexer, so a row repaired
+            # here and indexed concurrently is counted once
+            writer = RangeWriter()
+            for row in events:
+                writer.add(row)
+            await writer.flush(session)
+            changes = writer.changes
+            if found["unwithdrawn"]:
+                changes += await unwithdraw(session, target, found["unwithdrawn"], block)
+            await publish_changes(session, changes)
+            for change in changes:
+                RECONCILE_REPAIRS.labels(target.name, change["type"]).inc()
+            # e.g. the provider no longer serves logs that old
+            unrepaired = set(found["missing"] + found["withdrawn"] + found["unwithdrawn"]) - {change["lock_id"] for change in changes}
+            if unrepaired:
+                logger.warning("reconcile_unrepaired", target=target.name, lock_ids=sorted(unrepaired))
+        if done:
+            await save_cursor(session, target, 1, passes + 1)
+        else:
+            await save_cursor(session, target, next_lock_id + RECONCILE_BATCH_SIZE, passes)
+        await session.commit()
+
+    found["checked"] = len(chain)
+    found["done"] = done
+    return found
+
+
+async def reconcile_target(target, throttle=None):
+    """Reconciles one target's locks in passes, forever, resuming from its cursor"""
+    if not target.rpc_url:
+        logger.error("rpc_url_missing", target=target.name)
+        return
+    target.contract = get_contract(Web3(), target)
+    if not target.contract:
+        return
+    reader = ContractReader(target.contract.abi)
+
+    rpc = await RPCClient(target.rpc_url, throttle=throttle).connect()
+    try:
+        multicall = None
+        totals = {}
+        while True:
+            try:
+                if multicall is None:
+                    multicall = bool(await rpc.get_code(MULTICALL3_ADDRESS))
+                    logger.info("reconcile_started", target=target.name, multicall=multicall)
+
+                found = await reconcile_batch(rpc, target, reader, multicall)
+                if found is None:
+                    logger.info("reconcile_waiting", target=target.name, reason="not indexed yet", sample=True)
+                    await asyncio.sleep(RECONCILE_PASS_INTERVAL_SECONDS)
+                    continue
+
+                for kind, value in found.items():
+                    if kind != "done":
+                        totals[kind] = totals.get(kind, 0) + (value if kind == "checked" else len(value))
+                if found["done"]:
+                    logger.info("reconcile_pass_complete", target=target.name, **totals)
+                    totals = {}
+                    await asyncio.sleep(RECONCILE_PASS_INTERVAL_SECONDS)
+            except Exception as e:
+                logger.error("reconcile_error", target=target.name, error=str(e), exc_info=True)
+                await asyncio.sleep(5)
+    finally:
+        await rpc.close()
+
+
+async def run_target(target, throttle=None):
+    """One reconciler per target across processes; repairs are idempotent regardless"""
+    async with leadership(target, RECONCILE_LOCK_KEY):
+        await reconcile_target(target, throttle)
+
+
+async def run_reconciler(targets=None):
+    """
+    Compares every selected target's locks table with the contract's own
+    locks(id) state and repairs missing rows and withdrawn flags. Targets
+    sharing an RPC endpoint share one RPCBudget.
+    """
+    targets = selected_targets() if targets is None else targets
+    if not targets:
+        logger.error("reconcile_halted", reason="no targets configured")
+        return
+
+    await migrate_on_startup(indexer_engine)
+
+    budgets = {}
+    tasks = []
+    for target in targets:
+        budget = budgets.setdefault(target.rpc_url, RPCBudget(RECONCILE_RPC_RATE_LIMIT))
+        tasks.append(asyncio.create_task(run_target(target, budget.throttle_for(target.name))))
+    await asyncio.gather(*tasks)
+
+
+if __name__ == "__main__":
+    serve_metrics(RECONCILE_METRICS_PORT)
+    asyncio.run(run_reconciler())
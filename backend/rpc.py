@@ -0,0 +1,236 @@
+import asyncio
+import json
+import os
+import random
+import time
+from collections import OrderedDict, deque
+
+import aiohttp
+from web3 import AsyncWeb3, AsyncHTTPProvider
+from web3.exceptions import Web3RPCError
+
+from metrics import RPC_CALLS, RPC_ERRORS
+
+RPC_TIMEOUT_SECONDS = float(os.getenv("RPC_TIMEOUT_SECONDS", "10"))
+RPC_RETRIES = int(os.getenv("RPC_RETRIES", "3"))
+RPC_BACKOFF_SECONDS = float(os.getenv("RPC_BACKOFF_SECONDS", "0.5"))
+RPC_POOL_SIZE = int(os.getenv("RPC_POOL_SIZE", "20"))
+RPC_BATCH_SIZE = int(os.getenv("RPC_BATCH_SIZE", "100"))
+
+# Raised when an endpoint refuses JSON-RPC batches: web3 cannot find the
+# method on the batch object, or the node answers with a JSON-RPC error
+BATCH_UNSUPPORTED_ERRORS = (AttributeError, TypeError, NotImplementedError, Web3RPCError)
+
+# Transport-level failures worth retrying. JSON-RPC errors (bad params,
+# "too many results") are not: the caller has to change the request.
+RETRYABLE_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError, ConnectionError)
+# HTTP statuses that mean "try again later"; any other status is final
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+# Rate limiting reported inside a JSON-RPC error: some providers mirror the
+# HTTP status as the error code, others only say so in the message. Only
+# whole phrases are matched, since messages also carry hex block numbers.
+RETRYABLE_RPC_CODES = frozenset({429})
+RETRYABLE_MESSAGES = ("too many requests", "rate limit")
+
+
+def is_retryable(error):
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in RETRYABLE_STATUSES
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    if isinstance(error, Web3RPCError):
+        rpc_error = (error.rpc_response or {}).get("error")
+        if isinstance(rpc_error, dict) and rpc_error.get("code") in RETRYABLE_RPC_CODES:
+            return True
+    message = str(error).lower()
+    return any(marker in message for marker in RETRYABLE_MESSAGES)
+
+
+class RPCClient:
+    """
+    Non-blocking node access for the API and the indexer: AsyncWeb3 over one
+    pooled keep-alive aiohttp session, with per-call timeouts, jittered
+    exponential backoff, and coalescing of identical in-flight reads.
+    """
+
+    def __init__(self, url, timeout=RPC_TIMEOUT_SECONDS, retries=RPC_RETRIES, throttle=None):
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        # Optional coroutine function awaited before every request, e.g. an RPCBudget slot
+        self.throttle = throttle
+        # Retries are handled here, not by the provider
+        self.w3 = AsyncWeb3(AsyncHTTPProvider(url, exception_retry_configuration=None))
+        self._session = None
+        self._inflight = {}
+
+    async def connect(self):
+        """Creates the shared session on the running loop; call once before use"""
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=RPC_POOL_SIZE, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector)
+            await self.w3.provider.cache_async_session(self._session)
+        return self
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _with_retries(self, make_call, method):
+        for attempt in range(self.retries + 1):
+            if self.throttle is not None:
+                await self.throttle()
+            RPC_CALLS.labels(method).inc()
+            try:
+                return await asyncio.wait_for(make_call(), self.timeout)
+            except Exception as e:
+                RPC_ERRORS.labels(method).inc()
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+                await asyncio.sleep(random.uniform(0, RPC_BACKOFF_SECONDS * 2 ** attempt))
+
+    async def call(self, make_call, coalesce_key=None, method=None):
+        """
+        Runs `make_call()` (a coroutine factory) with timeout and retries.
+        Concurrent callers passing the same coalesce_key share one request.
+        `method` labels the RPC metrics; it defaults to the key's first item.
+        """
+        method = method or (coalesce_key[0] if coalesce_key else "unknown")
+        if coalesce_key is None:
+            return await self._with_retries(make_call, method)
+
+        future = self._inflight.get(coalesce_key)
+        if future is None:
+            future = asyncio.ensure_future(self._with_retries(make_call, method))
+            self._inflight[coalesce_key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(coalesce_key, None))
+        # Shield so one cancelled caller does not cancel the others' request
+        return await asyncio.shield(future)
+
+    async def is_connected(self):
+        try:
+            return await self.w3.is_connected()
+        except Exception:
+            return False
+
+    async def block_number(self):
+        return await self.call(lambda: self.w3.eth.block_number, coalesce_key=("eth_blockNumber",))
+
+    async def get_block(self, number):
+        return await self.call(lambda: self.w3.eth.get_block(number), coalesce_key=("eth_getBlockByNumber", number))
+
+    async def get_logs(self, log_filter):
+        key = ("eth_getLogs", json.dumps(log_filter, sort_keys=True, default=str))
+        return await self.call(lambda: self.w3.eth.get_logs(log_filter), coalesce_key=key)
+
+    async def get_blocks(self, numbers):
+        """
+        Block headers keyed by number, one JSON-RPC batch per RPC_BATCH_SIZE
+        blocks. Falls back to concurrent single calls if batching is refused.
+        """
+        numbers = sorted(set(numbers))
+        headers = {}
+
+        for i in range(0, len(numbers), RPC_BATCH_SIZE):
+            chunk = numbers[i:i + RPC_BATCH_SIZE]
+
+            async def batch_call():
+                async with self.w3.batch_requests() as batch:
+                    for number in chunk:
+                        batch.add(self.w3.eth.get_block(number))
+                    return await batch.async_execute()
+
+            try:
+                blocks = await self.call(batch_call, method="eth_getBlockByNumber_batch")
+            except BATCH_UNSUPPORTED_ERRORS:
+                blocks = await asyncio.gather(*(self.get_block(number) for number in chunk))
+
+            for block in blocks:
+                headers[block['number']] = block
+        return headers
+
+    async def eth_call(self, transaction, block="latest"):
+        return await self.call(lambda: self.w3.eth.call(transaction, block), method="eth_call")
+
+    async def eth_calls(self, transactions, block="latest"):
+        """
+        Return data of each call, in order, one JSON-RPC batch per
+        RPC_BATCH_SIZE calls; same fallback as get_blocks.
+        """
+        results = []
+        for i in range(0, len(transactions), RPC_BATCH_SIZE):
+            chunk = transactions[i:i + RPC_BATCH_SIZE]
+
+            async def batch_call():
+                async with self.w3.batch_requests() as batch:
+                    for transaction in chunk:
+                        batch.add(self.w3.eth.call(transaction, block))
+                    return await batch.async_execute()
+
+            try:
+                results += await self.call(batch_call, method="eth_call_batch")
+            except BATCH_UNSUPPORTED_ERRORS:
+                results += await asyncio.gather(*(self.eth_call(transaction, block) for transaction in chunk))
+        return results
+
+    async def get_code(self, address, block="latest"):
+        return await self.call(lambda: self.w3.eth.get_code(address, block), coalesce_key=("eth_getCode", address, block))
+
+
+class RPCBudget:
+    """
+    A requests-per-second token bucket shared by every indexer target on one
+    RPC endpoint. Once requests queue up, targets are served round-robin,
+    so one backfilling target cannot starve the others at the tip.
+    rate=0 means unlimited.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        # target name -> queued futures, in round-robin order
+        self.waiting = OrderedDict()
+        self._dispatcher = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, target):
+        if not self.rate:
+            return
+        self._refill()
+        if not self.waiting and self.tokens >= 1:
+            self.tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.setdefault(target, deque()).append(future)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        while self.waiting:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            target, queue = next(iter(self.waiting.items()))
+            future = queue.popleft()
+            if queue:
+                self.waiting.move_to_end(target)
+            else:
+                del self.waiting[target]
+            # A cancelled caller gives its slot to the next one
+            if not future.done():
+                future.set_result(None)
+                self.tokens -= 1
+
+    def throttle_for(self, target):
+        """The RPCClient `throttle` for one target"""
+        return lambda: self.acquire(target)
\ No newline at end of file
@@ -20,6 +20,8 @@ class CreateLockRequest(LockBase):
 
 
 class LockResponse(LockBase):
+    chain_id: int
+    contract_address: str
     id: int
     created_at: int
     withdrawn: bool
@@ -0,0 +1,57 @@
+import json
+
+from fastapi import Response
+
+from models import Lock
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback, same output
+    orjson = None
+
+# Columns behind schemas.LockResponse, selected as plain tuples
+LOCK_RESPONSE_COLUMNS = (
+    Lock.chain_id,
+    Lock.contract_address,
+    Lock.id,
+    Lock.goal_name,
+    Lock.unlock_timestamp,
+    Lock.amount,
+    Lock.created_at,
+    Lock.withdrawn,
+    Lock.owner_address,
+    Lock.tx_hash,
+)
+
+def dumps(content):
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":")).encode()
+
+def lock_rows_to_dicts(rows):
+    """
+    LockResponse-shaped dicts straight from column tuples, skipping ORM
+    hydration and per-row Pydantic validation.
+    """
+    return [
+        {
+            "chain_id": chain_id,
+            "contract_address": contract_address,
+            "goal_name": goal_name,
+            "unlock_timestamp": unlock_timestamp,
+            "amount": str(int(amount)),
+            "id": lock_id,
+            "created_at": created_at,
+            "withdrawn": withdrawn,
+            "owner_address": owner_address,
+            "tx_hash": tx_hash,
+        }
+        for chain_id, contract_address, lock_id, goal_name, unlock_timestamp, amount, created_at, withdrawn, owner_address, tx_hash in rows
+    ]
+
+class FastJSONResponse(Response):
+    """JSON response rendered by orjson when available"""
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps(content)
\ No newline at end of file
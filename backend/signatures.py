@@ -0,0 +1,78 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# ECDSA recovery is pure CPU (~10ms in pure Python), so it runs off the event
+# loop. Processes give real parallelism; threads are lighter on small hosts.
+SIGNATURE_WORKERS = int(os.getenv("SIGNATURE_WORKERS", str(os.cpu_count() or 1)))
+SIGNATURE_EXECUTOR = os.getenv("SIGNATURE_EXECUTOR", "process")
+# Requests beyond this many queued recoveries are shed instead of piling up
+SIGNATURE_MAX_PENDING = int(os.getenv("SIGNATURE_MAX_PENDING", str(SIGNATURE_WORKERS * 8)))
+
+
+def login_message(nonce):
+    return f"Sign this nonce to login: {nonce}"
+
+
+def recover_signer(message_text, signature):
+    """Address that signed `message_text` with personal_sign. No node needed."""
+    # eth_account takes most of a second to import; only workers pay for it
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
+    return Account.recover_message(encode_defunct(text=message_text), signature=signature)
+
+
+def _load_recovery():
+    """Imports eth_account in a worker ahead of the first login"""
+    import eth_account.messages  # noqa: F401
+
+
+class VerifierBusy(Exception):
+    """Too many recoveries are already queued"""
+
+
+class SignatureVerifier:
+    """Bounded worker pool for signature recovery"""
+
+    def __init__(self, workers=SIGNATURE_WORKERS, executor=SIGNATURE_EXECUTOR, max_pending=SIGNATURE_MAX_PENDING):
+        self.workers = workers
+        self.executor_kind = executor
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = 0
+
+    def _get_executor(self):
+        # Created on first use so importing this module stays cheap
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def recover(self, message_text, signature):
+        if self._pending >= self.max_pending:
+            raise VerifierBusy()
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), recover_signer, message_text, signature)
+        finally:
+            self._pending -= 1
+
+    def warm_up(self):
+        """Starts the pool and its imports in the background; returns immediately"""
+        executor = self._get_executor()
+        for _ in range(self.workers if self.executor_kind == "process" else 1):
+            executor.submit(_load_recovery)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+signature_verifier = SignatureVerifier()
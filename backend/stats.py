@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+from sqlalchemy import select, func, update, insert
+
+from models import User, Lock, PlatformStats
+
+# platform_stats holds exactly one row
+STATS_ROW_ID = 1
+
+def platform_totals(sync_conn):
+    """Full aggregates over locks and users; only for seeding and rebuilds"""
+    total_locks = sync_conn.execute(select(func.count(Lock.id))).scalar() or 0
+    if sync_conn.dialect.name == "sqlite":
+        # Amounts are strings there (models.WeiAmount); sum() would go through floats
+        tvl_wei = sum(int(amount) for amount in sync_conn.execute(
+            select(Lock.amount).where(Lock.withdrawn == False)
+        ).scalars())
+    else:
+        tvl_wei = sync_conn.execute(
+            select(func.sum(Lock.amount)).where(Lock.withdrawn == False)
+        ).scalar() or 0
+    total_users = sync_conn.execute(select(func.count(User.id))).scalar() or 0
+    return {"total_locks": total_locks, "tvl_wei": int(tvl_wei), "total_users": total_users}
+
+def seed_platform_stats(sync_conn):
+    """
+    Creates the summary row from full aggregates if it does not exist yet.
+    Runs once per database; afterwards every writer applies deltas instead.
+    """
+    exists = sync_conn.execute(
+        select(PlatformStats.id).where(PlatformStats.id == STATS_ROW_ID)
+    ).first()
+    if exists:
+        return
+    sync_conn.execute(insert(PlatformStats).values(id=STATS_ROW_ID, **platform_totals(sync_conn)))
+
+def recompute_platform_stats(sync_conn):
+    """Resets the summary row to full aggregates, e.g. after a projection rebuild"""
+    sync_conn.execute(
+        update(PlatformStats)
+        .where(PlatformStats.id == STATS_ROW_ID)
+        .values(**platform_totals(sync_conn))
+    )
+
+async def apply_stats_delta(session, locks=0, tvl_wei=0, users=0):
+    """
+    Adjusts the running totals inside the caller's transaction, so they
+    commit or roll back together with the rows they describe.
+    """
+    if not (locks or tvl_wei or users):
+        return
+    if session.bind.dialect.name == "sqlite":
+        # TVL is a string column there, so it is added up in Python; SQLite
+        # has a single writer, which makes the read-modify-write safe
+        current = await session.scalar(select(PlatformStats.tvl_wei).where(PlatformStats.id == STATS_ROW_ID))
+        new_tvl = (current or 0) + tvl_wei
+    else:
+        new_tvl = PlatformStats.tvl_wei + Decimal(tvl_wei)
+    await session.execute(
+        update(PlatformStats)
+        .where(PlatformStats.id == STATS_ROW_ID)
+        .values(
+            total_locks=PlatformStats.total_locks + locks,
+            tvl_wei=new_tvl,
+            total_users=PlatformStats.total_users + users,
+        )
+    )
+
+async def load_platform_stats(session):
+    return await session.get(PlatformStats, STATS_ROW_ID)
\ No newline at end of file
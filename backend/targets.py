@@ -0,0 +1,126 @@
+import json
+import os
+import zlib
+
+from eth_utils import to_checksum_address
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Every deployment the indexer follows, e.g.
+#   [{"name": "sepolia-v2", "chain_id": 11155111, "address": "0x...",
+#     "abi": "abis/SwitchV2.json", "start_block": 10179178}]
+# rpc_url / ws_url are optional per target; otherwise RPC_URL_<chain_id>
+# (and WS_RPC_URL_<chain_id>), then RPC_URL / WS_RPC_URL.
+INDEXER_TARGETS_FILE = os.getenv("INDEXER_TARGETS_FILE", "indexer_targets.json")
+# Comma-separated target names this process indexes; empty means all. Lets
+# several processes split the targets between them.
+INDEXER_TARGETS = [name.strip() for name in os.getenv("INDEXER_TARGETS", "").split(",") if name.strip()]
+
+DEPLOYMENT_CONFIG = "deployment_config.json"
+DEFAULT_ABI = "abis/SwitchV2.json"
+LEGACY_START_BLOCK = 10179178
+
+NETWORK_CHAIN_IDS = {
+    "mainnet": 1,
+    "sepolia": 11155111,
+    "holesky": 17000,
+    "development": 1337,
+}
+
+# The projections (projections.EVENT_HANDLERS) understand SwitchV2's events
+# only. SwitchSmartVault has no lock ids and a different Withdrawal, so its
+# ABI is refused rather than misread.
+REQUIRED_EVENTS = {"LockCreated", "Withdrawal", "EmergencyWithdrawal"}
+
+class IndexTarget:
+    """One contract deployment on one chain, with its own cursor"""
+
+    def __init__(self, name, chain_id, address, abi, start_block, rpc_url=None, ws_url=None):
+        self.name = name
+        self.chain_id = int(chain_id)
+        self.address = to_checksum_address(address)
+        self.abi_path = abi
+        self.start_block = int(start_block)
+        self.rpc_url = rpc_url or os.getenv(f"RPC_URL_{self.chain_id}") or os.getenv("RPC_URL")
+        self.ws_url = ws_url or os.getenv(f"WS_RPC_URL_{self.chain_id}") or os.getenv("WS_RPC_URL")
+        # Decoding contract, set by the indexer once the ABI is loaded
+        self.contract = None
+
+    @property
+    def lock_key(self):
+        """Second key of this target's leader advisory lock; stable across processes"""
+        return zlib.crc32(f"{self.chain_id}:{self.address.lower()}".encode()) & 0x7FFFFFFF
+
+    def load_abi(self):
+        artifact = os.path.basename(self.abi_path)
+        for path in (self.abi_path, os.path.join("..", "build", "contracts", artifact), os.path.join("build", "contracts", artifact)):
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                continue
+            abi = data["abi"] if isinstance(data, dict) else data
+            events = {item["name"] for item in abi if item.get("type") == "event"}
+            missing = REQUIRED_EVENTS - events
+            if missing:
+                raise ValueError(f"Target {self.name}: ABI {path} lacks {', '.join(sorted(missing))}")
+            return abi
+        return None
+
+    def __repr__(self):
+        return f"IndexTarget({self.name}, chain {self.chain_id}, {self.address})"
+
+def legacy_target():
+    """The single deployment described by deployment_config.json, if any"""
+    try:
+        with open(DEPLOYMENT_CONFIG, "r") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return None
+    chain_id = config.get("chain_id") or os.getenv("CHAIN_ID") or NETWORK_CHAIN_IDS.get(config.get("network"), 11155111)
+    return IndexTarget(
+        name=config.get("network", "default"),
+        chain_id=chain_id,
+        address=config["contract_address"].strip(),
+        abi=DEFAULT_ABI,
+        start_block=config.get("deployed_at_block", LEGACY_START_BLOCK),
+    )
+
+def load_targets(path=INDEXER_TARGETS_FILE):
+    """All configured targets: the targets file, or else the legacy deployment config"""
+    try:
+        with open(path, "r") as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        legacy = legacy_target()
+        return [legacy] if legacy else []
+
+    targets = [
+        IndexTarget(
+            name=entry.get("name") or f"{entry['chain_id']}-{entry['address'][:10]}",
+            chain_id=entry["chain_id"],
+            address=entry["address"],
+            abi=entry.get("abi", DEFAULT_ABI),
+            start_block=entry.get("start_block", 0),
+            rpc_url=entry.get("rpc_url"),
+            ws_url=entry.get("ws_url"),
+        )
+        for entry in entries
+    ]
+    keys = [(target.chain_id, target.address) for target in targets]
+    if len(set(keys)) != len(keys):
+        raise ValueError(f"{path} lists the same contract twice")
+    if len({target.name for target in targets}) != len(targets):
+        raise ValueError(f"{path} repeats a target name")
+    return targets
+
+def selected_targets():
+    """The targets this process should index (INDEXER_TARGETS), in config order"""
+    targets = load_targets()
+    if not INDEXER_TARGETS:
+        return targets
+    unknown = set(INDEXER_TARGETS) - {target.name for target in targets}
+    if unknown:
+        raise ValueError(f"INDEXER_TARGETS names unknown targets: {', '.join(sorted(unknown))}")
+    return [target for target in targets if target.name in INDEXER_TARGETS]
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Backend tests run from backend/ against a throwaway SQLite file, or against
+TEST_DATABASE_URL (e.g. a scratch Postgres database, which they wipe).
+
+    cd backend && python -m pytest
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+from eth_abi import decode
+from web3 import Web3
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
+
+# Modules read their configuration at import, so this runs before any of them
+os.environ["DATABASE_URL"] = os.getenv(
+    "TEST_DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/test.db"
+)
+os.environ.pop("READ_DATABASE_URL", None)
+os.environ.update(
+    JWT_SECRET="test-secret-test-secret-test-secret",
+    ALGORITHM="HS256",
+    RPC_URL="http://127.0.0.1:9",
+    SIGNATURE_EXECUTOR="thread",
+    RUN_EMBEDDED_INDEXER="false",
+    INDEXER_TARGETS_FILE="missing-targets.json",
+    INDEXER_CONFIRMATIONS="12",
+    LOG_LEVEL="WARNING",
+)
+
+
+def run(coro):
+    """Runs a test coroutine, then closes pooled connections bound to its loop"""
+    async def wrapper():
+        try:
+            return await coro
+        finally:
+            from database import engine, read_engine
+            for module_engine in {engine, read_engine, getattr(sys.modules.get("indexer"), "indexer_engine", engine)}:
+                await module_engine.dispose()
+    return asyncio.run(wrapper())
+
+
+def chain_state(chain):
+    """lock id -> (owner, amount, withdrawn), decoded from the mock chain's logs"""
+    from benchmarks.mock_rpc import LOCK_CREATED, WITHDRAWAL, EMERGENCY_WITHDRAWAL
+
+    locks = {}
+    for number in sorted(chain.logs_by_block):
+        for log in chain.logs_by_block[number]:
+            lock_id = int.from_bytes(log["topics"][1], "big")
+            if log["topics"][0] == LOCK_CREATED:
+                owner = Web3.to_checksum_address(log["topics"][2][-20:])
+                amount = decode(["uint256", "uint256", "string"], log["data"])[0]
+                locks[lock_id] = (owner, amount, False)
+            elif log["topics"][0] in (WITHDRAWAL, EMERGENCY_WITHDRAWAL):
+                locks[lock_id] = locks[lock_id][:2] + (True,)
+    return locks
+
+
+class MockIndexer:
+    """The indexer's range loop over a benchmarks.mock_rpc.MockChain, as one target"""
+
+    def __init__(self, chain):
+        from benchmarks.mock_rpc import MockRPC
+
+        self.chain = chain
+        self.rpc = MockRPC(chain)
+        self.target = chain.target("test")
+
+    async def sync(self, start=None, end=None, window=16):
+        """Indexes [start, end]: by default from the cursor up to the chain's tip"""
+        import indexer
+
+        if start is None:
+            start = await indexer.resume_block(self.rpc, self.target)
+        end = self.chain.tip if end is None else end
+        await indexer.sync_blocks(self.rpc, self.target, start, end, indexer.AdaptiveWindow(size=window))
+
+
+@pytest.fixture
+def schema():
+    """An empty, fully migrated schema"""
+    from database import engine, create_schema
+    from models import Base
+
+    async def reset():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(create_schema)
+
+    run(reset())
+
+
+@pytest.fixture
+def mock_indexer(schema):
+    """MockIndexer, over an empty schema"""
+    return MockIndexer
@@ -0,0 +1,86 @@
+"""Bearer token checks, and the token and user caches in front of them"""
+import time
+from datetime import datetime, timedelta
+
+import httpx
+import jwt
+from sqlalchemy import delete
+
+from tests.conftest import run
+
+ADDRESS = "0x" + "Ab" * 20
+
+
+def token(**claims):
+    import main
+    return jwt.encode(claims, main.JWT_SECRET, algorithm=main.ALGORITHM)
+
+
+def test_tokens_missing_required_claims_are_rejected(schema):
+    import main
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            statuses = []
+            for claims in ({"sub": ADDRESS}, {"exp": datetime.utcnow() + timedelta(hours=1)}):
+                response = await client.get("/users/me", headers={"Authorization": f"Bearer {token(**claims)}"})
+                statuses.append(response.status_code)
+            return statuses
+
+    assert run(scenario()) == [401, 401]
+
+
+def test_cached_user_is_served_until_invalidated(schema):
+    import main
+    from auth_cache import cached_token_address, invalidate_user, token_cache, user_cache
+    from database import async_session
+    from models import User
+
+    token_cache.clear()
+    user_cache.clear()
+    bearer = main.create_access_token({"sub": ADDRESS})
+
+    async def scenario():
+        async with async_session() as session:
+            session.add(User(address=ADDRESS))
+            await session.commit()
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def me():
+                response = await client.get("/users/me", headers={"Authorization": f"Bearer {bearer}"})
+                return response.status_code
+
+            statuses = [await me()]
+            cached = cached_token_address(bearer), user_cache.get(ADDRESS) is not None
+
+            # The row is gone, but the cached copy still answers...
+            async with async_session() as session:
+                await session.execute(delete(User).where(User.address == ADDRESS))
+                await session.commit()
+            statuses.append(await me())
+            # ...until the writer invalidates it
+            invalidate_user(ADDRESS)
+            statuses.append(await me())
+            return statuses, cached
+
+    statuses, cached = run(scenario())
+
+    assert cached == (ADDRESS, True)
+    assert statuses == [200, 200, 401]
+
+
+def test_cache_entries_expire():
+    from auth_cache import cache_token, cached_token_address
+    from cache import TTLCache
+
+    users = TTLCache(10, ttl=0.05)
+    users.put("user", "row")
+    # A token is never cached past its own exp, even below the cache TTL
+    cache_token("short-lived", ADDRESS, time.time() + 0.05)
+    fresh = users.get("user"), cached_token_address("short-lived")
+    time.sleep(0.1)
+
+    assert fresh == ("row", ADDRESS)
+    assert (users.get("user"), cached_token_address("short-lived")) == (None, None)
@@ -0,0 +1,72 @@
+"""/export/locks as NDJSON and CSV, with its block and timestamp filters"""
+import csv
+import io
+import json
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+from benchmarks.mock_rpc import MockChain
+from tests.conftest import run
+
+CONTRACT_ADDRESS = "0x" + "9c" * 20
+
+
+def parse(fmt, body):
+    if fmt == "csv":
+        return list(csv.DictReader(io.StringIO(body)))
+    return [json.loads(line) for line in body.splitlines()]
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_export_filters_and_orders_locks(mock_indexer, monkeypatch, fmt):
+    import export
+    import main
+    from database import engine
+    from models import Lock
+
+    # Several server-side batches per export
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 7)
+    chain = MockChain(CONTRACT_ADDRESS, locks=40, blocks=90, users=5)
+    filters = {
+        "all": {},
+        "blocks": {"from_block": 20, "to_block": 50},
+        "other_chain": {"chain_id": 1},
+    }
+
+    async def scenario():
+        await mock_indexer(chain).sync()
+        async with engine.connect() as conn:
+            stored = (await conn.execute(select(Lock.id, Lock.block_number, Lock.created_at, Lock.amount))).all()
+        # Bounds on real created_at values, so both edges are hit
+        created_at = sorted(row.created_at for row in stored)
+        filters["created"] = {"created_after": created_at[10], "created_before": created_at[25]}
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            exports = {}
+            for name, params in filters.items():
+                response = await client.get("/export/locks", params={"format": fmt, **params})
+                assert response.status_code == 200
+                assert response.headers["content-type"].startswith(export.MEDIA_TYPES[fmt])
+                exports[name] = response.text
+        return stored, exports
+
+    stored, exports = run(scenario())
+    created = filters["created"]
+    records = {name: parse(fmt, body) for name, body in exports.items()}
+
+    assert [int(r["id"]) for r in records["all"]] == sorted(row.id for row in stored) == list(range(1, 41))
+    assert [int(r["id"]) for r in records["blocks"]] == sorted(row.id for row in stored if 20 <= row.block_number <= 50)
+    assert [int(r["id"]) for r in records["created"]] == sorted(
+        row.id for row in stored if created["created_after"] <= row.created_at < created["created_before"]
+    )
+    assert 0 < len(records["created"]) < len(records["blocks"]) < 40
+    assert records["other_chain"] == []
+    # Exact wei amounts, as strings in both formats
+    assert {int(r["id"]): r["amount"] for r in records["all"]} == {row.id: str(int(row.amount)) for row in stored}
+    if fmt == "csv":
+        # One header, also when nothing matches
+        assert exports["all"].count("chain_id,contract_address,id") == 1
+        assert exports["other_chain"].strip() == ",".join(export.LOCK_EXPORT.fields)
@@ -0,0 +1,105 @@
+"""Lock changes reach feed subscribers once per committed range, and never from a rolled-back one"""
+import asyncio
+import json
+from collections import Counter
+
+from sqlalchemy import text
+
+from benchmarks.mock_rpc import MockChain, LOCK_CREATED
+from tests.conftest import run, chain_state
+
+CONTRACT_ADDRESS = "0x" + "7d" * 20
+SENTINEL = "0x" + "ee" * 20
+
+
+class RangeLost(Exception):
+    pass
+
+
+def test_only_committed_ranges_are_published(mock_indexer, monkeypatch):
+    import indexer
+    from database import engine, DATABASE_URL
+    from feed import broadcaster, listen_for_changes, FEED_CHANNEL
+
+    chain = MockChain(CONTRACT_ADDRESS, locks=20, blocks=64, users=3)
+    chain.tip = 64
+    postgres = engine.dialect.name == "postgresql"
+    save_sync_cursor = indexer.save_sync_cursor
+
+    async def failing_save_sync_cursor(session, target, block_number):
+        # After the range's rows and changes were written, before its commit
+        if block_number == 32:
+            raise RangeLost
+        await save_sync_cursor(session, target, block_number)
+
+    async def scenario():
+        mock = mock_indexer(chain)
+        owners = {owner for owner, _, _ in chain_state(chain).values()}
+        subscribers = {owner: broadcaster.subscribe(owner) for owner in owners}
+        subscribers[SENTINEL] = broadcaster.subscribe(SENTINEL)
+        queues = [queue for owner, (_, queue) in subscribers.items() if owner != SENTINEL]
+        _, sentinel = subscribers[SENTINEL]
+        listener = None
+        if postgres:
+            listener = asyncio.create_task(listen_for_changes(DATABASE_URL.replace("+asyncpg", "")))
+
+        async def settle():
+            """Every change published so far, once a marker sent after them comes back"""
+            while True:
+                if postgres:
+                    async with engine.begin() as conn:
+                        await conn.execute(text("SELECT pg_notify(:channel, :payload)"), {
+                            "channel": FEED_CHANNEL, "payload": json.dumps({"owner_address": SENTINEL}),
+                        })
+                else:
+                    broadcaster.publish({"owner_address": SENTINEL})
+                try:
+                    await asyncio.wait_for(sentinel.get(), 0.5)
+                    break
+                except asyncio.TimeoutError:
+                    # The listener is still connecting
+                    continue
+            while not sentinel.empty():
+                sentinel.get_nowait()
+            changes = []
+            for queue in queues:
+                while not queue.empty():
+                    changes.append(queue.get_nowait())
+            return changes
+
+        try:
+            await settle()
+            monkeypatch.setattr(indexer, "save_sync_cursor", failing_save_sync_cursor)
+            try:
+                await mock.sync(1, 64, window=16)
+            except RangeLost:
+                pass
+            before_retry = await settle()
+            monkeypatch.setattr(indexer, "save_sync_cursor", save_sync_cursor)
+            await mock.sync(window=16)
+            after_retry = await settle()
+        finally:
+            if listener:
+                listener.cancel()
+                await asyncio.gather(listener, return_exceptions=True)
+            for owner, subscriber in subscribers.items():
+                broadcaster.unsubscribe(owner, subscriber)
+        return before_retry, after_retry
+
+    before_retry, after_retry = run(scenario())
+
+    def published(changes):
+        return Counter((change["type"], change["lock_id"], change["block_number"]) for change in changes)
+
+    def on_chain(first, last):
+        changes = Counter()
+        for number in range(first, last + 1):
+            for log in chain.logs_by_block.get(number, []):
+                lock_id = int.from_bytes(log["topics"][1], "big")
+                changes["lock_created" if log["topics"][0] == LOCK_CREATED else "lock_withdrawn", lock_id, number] += 1
+        return changes
+
+    # Blocks 1-16 committed; 17-32 was rolled back along with its changes
+    assert published(before_retry) == on_chain(1, 16)
+    assert published(after_retry) == on_chain(17, 64)
+    assert on_chain(17, 32) and on_chain(1, 16)
@@ -0,0 +1,46 @@
+"""Liveness and readiness probes"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+from tests.conftest import run
+
+
+class UnreachableEngine:
+    """Stands in for an engine whose pool is exhausted or whose database never answers"""
+
+    @asynccontextmanager
+    async def connect(self):
+        await asyncio.sleep(60)
+        yield
+
+
+def probe(path):
+    import main
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(path)
+            return response.status_code, response.json()
+
+    return run(scenario())
+
+
+def test_ready_once_the_schema_is_migrated(schema):
+    assert probe("/healthz")[0] == 200
+    assert probe("/readyz") == (200, {"status": "ready"})
+
+
+def test_readiness_times_out_waiting_for_a_connection(monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "engine", UnreachableEngine())
+    monkeypatch.setattr(main, "READINESS_TIMEOUT_SECONDS", 0.1)
+    start = time.perf_counter()
+    status, body = probe("/readyz")
+
+    assert (status, body) == (503, {"status": "database_unavailable", "error": "TimeoutError"})
+    assert time.perf_counter() - start < 5
@@ -0,0 +1,49 @@
+"""A target's indexing stops before its leader lock is given up"""
+import asyncio
+from contextlib import asynccontextmanager
+
+from tests.conftest import run
+
+
+def test_indexing_stops_before_the_lock_is_released(monkeypatch):
+    import indexer
+    from targets import IndexTarget
+
+    events = []
+
+    class LostConnection:
+        async def execute(self, statement):
+            raise ConnectionError("leader lock connection lost")
+
+    @asynccontextmanager
+    async def leadership(target, key=indexer.LEADER_LOCK_KEY):
+        events.append("acquired")
+        try:
+            yield LostConnection()
+        finally:
+            events.append("released")
+
+    async def indexer_logic(target, throttle=None):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            # e.g. a commit still in flight when the cancel arrives
+            await asyncio.sleep(0.05)
+            events.append("indexing_stopped")
+            raise
+
+    monkeypatch.setattr(indexer, "leadership", leadership)
+    monkeypatch.setattr(indexer, "_indexer_logic", indexer_logic)
+    monkeypatch.setattr(indexer, "LEADER_CHECK_SECONDS", 0.01)
+
+    async def scenario():
+        target = IndexTarget("test", 1337, "0x" + "5e" * 20, "abis/SwitchV2.json", 1)
+        task = asyncio.create_task(indexer.run_target(target))
+        while "released" not in events:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    run(scenario())
+
+    assert events[:3] == ["acquired", "indexing_stopped", "released"]
@@ -0,0 +1,132 @@
+"""A single-contract (pre multi-chain) database is re-keyed by chain and contract without losing rows"""
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, Boolean, BigInteger, Numeric, DateTime, ForeignKey, JSON,
+    inspect, select, func,
+)
+
+from tests.conftest import run
+
+LEGACY_ADDRESS = "0x" + "4c" * 20
+OWNER = "0x" + "ab" * 20
+
+# The chain-keyed tables as they were before they gained chain_id
+legacy = MetaData()
+Table("users", legacy,
+      Column("id", Integer, primary_key=True),
+      Column("address", String(42), unique=True, nullable=False),
+      Column("nonce", String(255)),
+      Column("created_at", DateTime))
+Table("locks", legacy,
+      Column("id", Integer, primary_key=True),
+      Column("amount", Numeric(78, 0), nullable=False),
+      Column("unlock_timestamp", BigInteger, nullable=False),
+      Column("created_at", BigInteger, nullable=False),
+      Column("goal_name", String(64)),
+      Column("withdrawn", Boolean),
+      Column("owner_address", String(42), ForeignKey("users.address"), nullable=False),
+      Column("tx_hash", String(66), nullable=False),
+      Column("block_number", BigInteger),
+      Column("withdrawn_block", BigInteger))
+Table("notifications", legacy,
+      Column("id", Integer, primary_key=True),
+      Column("lock_id", Integer, ForeignKey("locks.id"), nullable=False),
+      Column("email", String(255), nullable=False),
+      Column("notify_before_seconds", Integer),
+      Column("sent", Boolean),
+      Column("due_at", BigInteger))
+Table("sync_cursors", legacy,
+      Column("contract_address", String(42), primary_key=True),
+      Column("last_block", BigInteger, nullable=False),
+      Column("updated_at", DateTime))
+Table("indexed_blocks", legacy,
+      Column("number", BigInteger, primary_key=True),
+      Column("hash", String(66), nullable=False),
+      Column("parent_hash", String(66)))
+Table("chain_events", legacy,
+      Column("block_number", BigInteger, primary_key=True),
+      Column("log_index", Integer, primary_key=True),
+      Column("contract_address", String(42), nullable=False),
+      Column("event", String(32), nullable=False),
+      Column("lock_id", BigInteger),
+      Column("args", JSON, nullable=False),
+      Column("block_timestamp", BigInteger),
+      Column("tx_hash", String(66), nullable=False))
+
+LEGACY_ROWS = {
+    "users": [{"id": 1, "address": OWNER}],
+    "locks": [
+        {"id": lock_id, "amount": 10**18 * lock_id, "unlock_timestamp": 2_000_000_000, "created_at": 1_700_000_000 + lock_id,
+         "goal_name": f"Goal {lock_id}", "withdrawn": lock_id == 2, "owner_address": OWNER, "tx_hash": "0x" + "11" * 32,
+         "block_number": 100 + lock_id, "withdrawn_block": 150 if lock_id == 2 else None}
+        for lock_id in (1, 2)
+    ],
+    "notifications": [{"id": 1, "lock_id": 1, "email": "saver@example.com", "notify_before_seconds": 3600,
+                       "sent": False, "due_at": 2_000_000_000 - 3600}],
+    "sync_cursors": [{"contract_address": LEGACY_ADDRESS, "last_block": 160}],
+    "indexed_blocks": [{"number": 160, "hash": "0x" + "22" * 32, "parent_hash": "0x" + "33" * 32}],
+    "chain_events": [{"block_number": 101, "log_index": 0, "contract_address": LEGACY_ADDRESS, "event": "LockCreated",
+                      "lock_id": 1, "args": {"lockId": "1"}, "block_timestamp": 1_700_000_001, "tx_hash": "0x" + "11" * 32}],
+}
+
+
+def test_legacy_rows_are_rekeyed_once(monkeypatch):
+    import database
+    from database import engine, create_schema, CHAIN_KEYED_TABLES
+    from models import Base, Lock, Notification
+    from targets import IndexTarget
+
+    target = IndexTarget("legacy", 11155111, LEGACY_ADDRESS, "abis/SwitchV2.json", 1)
+    monkeypatch.setattr(database, "legacy_target", lambda: target)
+
+    def primary_keys(sync_conn):
+        inspector = inspect(sync_conn)
+        return {name: inspector.get_pk_constraint(name)["constrained_columns"] for name in CHAIN_KEYED_TABLES}
+
+    def snapshot(sync_conn):
+        tables = Base.metadata.tables
+        return {
+            name: sorted(tuple(row) for row in sync_conn.execute(select(tables[name])).all())
+            for name in CHAIN_KEYED_TABLES + ("users",)
+        }
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(legacy.drop_all)
+            await conn.run_sync(legacy.create_all)
+            for name, rows in LEGACY_ROWS.items():
+                await conn.execute(legacy.tables[name].insert(), rows)
+
+        states = []
+        for _ in range(2):
+            async with engine.begin() as conn:
+                await conn.run_sync(create_schema)
+            async with engine.connect() as conn:
+                states.append((await conn.run_sync(primary_keys), await conn.run_sync(snapshot)))
+
+        async with engine.begin() as conn:
+            # The point of the new keys: the same lock id on another contract
+            await conn.execute(Lock.__table__.insert(), {
+                **LEGACY_ROWS["locks"][0], "chain_id": 1, "contract_address": "0x" + "5e" * 20,
+            })
+            linked = await conn.scalar(
+                select(func.count()).select_from(Notification).join(Lock, (Lock.chain_id == Notification.chain_id)
+                    & (Lock.contract_address == Notification.contract_address) & (Lock.id == Notification.lock_id))
+            )
+        return states, linked
+
+    states, linked = run(scenario())
+    (keys, rows), (keys_again, rows_again) = states
+
+    assert keys == {
+        "locks": ["chain_id", "contract_address", "id"],
+        "notifications": ["id"],
+        "chain_events": ["chain_id", "block_number", "log_index"],
+        "indexed_blocks": ["chain_id", "contract_address", "number"],
+        "sync_cursors": ["chain_id", "contract_address"],
+    }
+    assert (keys_again, rows_again) == (keys, rows)
+    for name in CHAIN_KEYED_TABLES:
+        assert len(rows[name]) == len(LEGACY_ROWS[name])
+    assert rows["users"] == [(1, OWNER, None, None)]
+    assert linked == 1
@@ -0,0 +1,35 @@
+"""Login challenges must be shared once there is more than one API worker"""
+import pytest
+
+from tests.conftest import run
+
+
+def test_memory_store_is_refused_for_several_workers():
+    from nonce_store import create_nonce_store
+
+    with pytest.raises(ValueError, match="NONCE_STORE_URL"):
+        create_nonce_store(None, workers=4)
+
+
+def test_shared_store_round_trip():
+    from nonce_store import create_nonce_store, is_unshared
+
+    store = create_nonce_store("fake://", workers=4)
+    assert not is_unshared(store)
+
+    async def scenario():
+        await store.put("0xabc", "n1")
+        return await store.consume("0xabc"), await store.consume("0xabc")
+
+    assert run(scenario()) == ("n1", None)
+
+
+def test_stores_must_implement_put_and_consume():
+    from nonce_store import NonceStore
+
+    class PutOnly(NonceStore):
+        async def put(self, address, nonce, ttl=None):
+            pass
+
+    with pytest.raises(TypeError):
+        PutOnly()
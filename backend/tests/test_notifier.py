@@ -0,0 +1,85 @@
+"""Unlock reminders: due times, claiming, delivery and retries"""
+import pytest
+from eth_utils import to_checksum_address
+from sqlalchemy import select
+
+from notifier import NotificationSender
+from tests.conftest import run
+
+OWNER = to_checksum_address("0x" + "ab" * 20)
+CONTRACT = to_checksum_address("0x" + "5e" * 20)
+
+
+class RecordingSender(NotificationSender):
+    """Keeps delivered batches; the first `failures` sends raise instead"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.batches = []
+
+    async def send(self, reminders):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("mail server unavailable")
+        self.batches.append(reminders)
+
+
+def test_due_reminders_are_sent_once_and_retried_after_a_failure(schema):
+    import notifier
+    from database import async_session
+    from models import User, Lock, Notification
+
+    # lock id -> (unlock_timestamp, withdrawn); each reminder is due 1000s before
+    locks = {1: (10_000, False), 2: (20_000, False), 3: (10_000, True)}
+    sender = RecordingSender(failures=1)
+
+    async def scenario():
+        async with async_session() as session:
+            session.add(User(address=OWNER))
+            for lock_id, (unlock, withdrawn) in locks.items():
+                session.add(Lock(
+                    chain_id=1, contract_address=CONTRACT, id=lock_id, amount=10**18, unlock_timestamp=unlock,
+                    created_at=1, goal_name=f"Goal {lock_id}", withdrawn=withdrawn,
+                    owner_address=OWNER, tx_hash="0x" + "11" * 32,
+                ))
+                session.add(Notification(
+                    chain_id=1, contract_address=CONTRACT, lock_id=lock_id,
+                    email=f"saver{lock_id}@example.com", notify_before_seconds=1000,
+                ))
+            await session.commit()
+
+        async with async_session() as session:
+            async with session.begin():
+                await notifier.fill_due_times(session)
+        async with async_session() as session:
+            due = dict((await session.execute(select(Notification.lock_id, Notification.due_at))).all())
+        async with async_session() as session:
+            async with session.begin():
+                claimable = sorted(row.lock_id for row in await notifier.claim_due(session, 9_000, 10))
+
+        with pytest.raises(ConnectionError):
+            await notifier.process_batch(sender, now=9_000)
+        processed = [
+            await notifier.process_batch(sender, now=9_000),
+            # Nothing is sent twice, and lock 2 is not due yet
+            await notifier.process_batch(sender, now=9_000),
+            await notifier.process_batch(sender, now=19_000),
+        ]
+        async with async_session() as session:
+            sent = dict((await session.execute(select(Notification.lock_id, Notification.sent))).all())
+        return due, claimable, processed, sent
+
+    due, claimable, processed, sent = run(scenario())
+
+    assert due == {1: 9_000, 2: 19_000, 3: 9_000}
+    assert claimable == [1, 3]
+    # Lock 3 was withdrawn: claimed and closed out, but no reminder goes out
+    assert processed == [2, 0, 1]
+    assert [[reminder["lock_id"] for reminder in batch] for batch in sender.batches] == [[1], [2]]
+    assert sender.batches[0][0]["email"] == "saver1@example.com"
+    assert sent == {1: True, 2: True, 3: True}
+
+
+def test_senders_must_implement_send():
+    with pytest.raises(TypeError):
+        NotificationSender()
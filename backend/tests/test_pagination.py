@@ -0,0 +1,76 @@
+"""Keyset pagination of an owner's locks through X-Next-Cursor"""
+import httpx
+import pytest
+from eth_utils import to_checksum_address
+
+from tests.conftest import run
+
+OWNER = to_checksum_address("0x" + "ab" * 20)
+CONTRACTS = ("0x" + "1a" * 20, "0x" + "2b" * 20)
+
+
+def seed(session):
+    """Two contracts with overlapping lock ids, five locks per created_at second"""
+    from models import User, Lock
+
+    session.add(User(address=OWNER))
+    locks = []
+    for n in range(26):
+        contract = CONTRACTS[n % 2]
+        locks.append(Lock(
+            chain_id=1, contract_address=contract, id=n // 2 + 1, amount=10**18,
+            unlock_timestamp=2_000_000_000, created_at=1_700_000_000 + n // 5,
+            owner_address=OWNER, tx_hash="0x" + "11" * 32, withdrawn=False,
+        ))
+    session.add_all(locks)
+    return sorted((lock.created_at, lock.id, lock.chain_id, lock.contract_address) for lock in locks)
+
+
+def walk(client, order, limit):
+    """Every page of the owner's locks, and the cursor headers seen"""
+    async def pages():
+        keys, cursors = [], []
+        params = {"order": order, "limit": limit}
+        while True:
+            response = await client.get(f"/users/{OWNER}/locks", params=params)
+            assert response.status_code == 200
+            keys += [(lock["created_at"], lock["id"], lock["chain_id"], lock["contract_address"]) for lock in response.json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            cursors.append(cursor)
+            if cursor is None:
+                return keys, cursors
+            params["cursor"] = cursor
+    return pages()
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_pages_cover_every_lock_once_in_order(schema, order):
+    import main
+    from database import async_session
+
+    async def scenario():
+        async with async_session() as session:
+            expected = seed(session)
+            await session.commit()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Pages of 4 split every run of tied created_at values
+            keys, cursors = await walk(client, order, limit=4)
+        return expected, keys, cursors
+
+    expected, keys, cursors = run(scenario())
+
+    assert keys == (expected if order == "asc" else expected[::-1])
+    assert len(cursors) == 7 and cursors[-1] is None and None not in cursors[:-1]
+
+
+def test_malformed_cursor_is_rejected(schema):
+    import main
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(f"/users/{OWNER}/locks", params={"cursor": "not-a-cursor"})
+            return response.status_code, response.json()
+
+    assert run(scenario()) == (400, {"detail": "Invalid cursor"})
@@ -0,0 +1,46 @@
+"""Rebuilding the projections from chain_events keeps every lock and reminder"""
+import pytest
+from sqlalchemy import select, delete
+
+from benchmarks.mock_rpc import MockChain
+from tests.conftest import run, chain_state
+
+CONTRACT_ADDRESS = "0x" + "7a" * 20
+
+
+def test_rebuild_keeps_reminders_and_refuses_unbacked_locks(mock_indexer):
+    import indexer
+    from models import Lock, Notification, ChainEvent
+    from projections import rebuild_projections
+
+    chain = MockChain(CONTRACT_ADDRESS, locks=20, blocks=60, users=4)
+
+    async def scenario():
+        mock = mock_indexer(chain)
+        target = mock.target
+        await mock.sync()
+        async with indexer.IndexerSession() as session:
+            session.add(Notification(
+                chain_id=target.chain_id, contract_address=target.address, lock_id=3,
+                email="saver@example.com", notify_before_seconds=3600,
+            ))
+            await session.commit()
+
+        await rebuild_projections()
+        async with indexer.IndexerSession() as session:
+            rebuilt = (await session.execute(select(Lock.id, Lock.owner_address, Lock.amount, Lock.withdrawn))).all()
+            await session.execute(delete(ChainEvent).where(ChainEvent.event == "LockCreated", ChainEvent.lock_id == 3))
+            await session.commit()
+
+        with pytest.raises(RuntimeError, match="no LockCreated event"):
+            await rebuild_projections()
+        async with indexer.IndexerSession() as session:
+            kept = (await session.execute(select(Lock.id))).scalars().all()
+            notifications = (await session.execute(select(Notification.lock_id))).scalars().all()
+        return rebuilt, kept, notifications
+
+    rebuilt, kept, notifications = run(scenario())
+
+    assert {row.id: (row.owner_address, int(row.amount), row.withdrawn) for row in rebuilt} == chain_state(chain)
+    assert sorted(kept) == sorted(chain_state(chain))
+    assert notifications == [3]
@@ -0,0 +1,84 @@
+"""The reconciler repairs the locks table from the contract's own state, through Multicall3 or batched eth_calls"""
+import pytest
+from sqlalchemy import select
+from web3 import Web3
+
+from benchmarks.mock_rpc import MockChain, GENESIS_TIMESTAMP, WITHDRAWAL, EMERGENCY_WITHDRAWAL
+from tests.conftest import run, chain_state
+
+CONTRACT_ADDRESS = "0x" + "8b" * 20
+OWNER = Web3.to_checksum_address("0x" + "cd" * 20)
+
+
+def drop_withdrawal(chain, lock_id):
+    """Removes a lock's withdrawal from the chain, as if it had never happened"""
+    for number, logs in chain.logs_by_block.items():
+        chain.logs_by_block[number] = [
+            log for log in logs
+            if not (log["topics"][0] in (WITHDRAWAL, EMERGENCY_WITHDRAWAL) and int.from_bytes(log["topics"][1], "big") == lock_id)
+        ]
+
+
+@pytest.mark.parametrize("multicall", [True, False], ids=["multicall3", "eth_call_batch"])
+def test_reconciler_repairs_missed_and_bogus_events(mock_indexer, monkeypatch, multicall):
+    import indexer
+    import reconcile
+    from database import engine
+    from models import Lock, ChainEvent
+    from stats import load_platform_stats, platform_totals
+
+    # Several batches per pass, so the cursor is exercised too
+    monkeypatch.setattr(reconcile, "RECONCILE_BATCH_SIZE", 8)
+    chain = MockChain(CONTRACT_ADDRESS, locks=30, blocks=60, users=4)
+    # Every event is final well before the tip
+    chain.tip = 80
+
+    async def scenario():
+        mock = mock_indexer(chain)
+        mock.rpc.multicall = multicall
+        target = mock.target
+        await mock.sync()
+
+        # Changes the indexer never saw: a lock and a withdrawal it missed,
+        # and a withdrawal it recorded that the chain does not have
+        indexed = chain_state(chain)
+        open_lock = next(lock_id for lock_id, (_, _, withdrawn) in indexed.items() if not withdrawn)
+        withdrawn_lock = next(lock_id for lock_id, (_, _, withdrawn) in indexed.items() if withdrawn)
+        chain.add_lock(45, 31, OWNER, 3 * 10**18, GENESIS_TIMESTAMP + 10**8)
+        chain.add_withdrawal(55, open_lock, *indexed[open_lock][:2])
+        drop_withdrawal(chain, withdrawn_lock)
+
+        reader = reconcile.ContractReader(target.contract.abi)
+        assert bool(await mock.rpc.get_code(reconcile.MULTICALL3_ADDRESS)) == multicall
+        passes = []
+        for _ in range(2):
+            found = {"missing": [], "withdrawn": [], "unwithdrawn": [], "mismatch": []}
+            while True:
+                batch = await reconcile.reconcile_batch(mock.rpc, target, reader, multicall)
+                for kind in found:
+                    found[kind] += batch[kind]
+                if batch["done"]:
+                    break
+            passes.append(found)
+
+        async with engine.connect() as conn:
+            rows = (await conn.execute(select(Lock.id, Lock.owner_address, Lock.amount, Lock.withdrawn))).all()
+            withdrawal_events = (await conn.execute(
+                select(ChainEvent.lock_id).where(ChainEvent.event.in_(reconcile.WITHDRAWAL_EVENTS))
+            )).scalars().all()
+            created_31 = await conn.scalar(
+                select(ChainEvent.block_number).where(ChainEvent.event == "LockCreated", ChainEvent.lock_id == 31)
+            )
+            totals = await conn.run_sync(platform_totals)
+        async with indexer.IndexerSession() as session:
+            stats = await load_platform_stats(session)
+        return open_lock, withdrawn_lock, passes, rows, withdrawal_events, created_31, stats, totals
+
+    open_lock, withdrawn_lock, passes, rows, withdrawal_events, created_31, stats, totals = run(scenario())
+
+    assert passes[0] == {"missing": [31], "withdrawn": [open_lock], "unwithdrawn": [withdrawn_lock], "mismatch": []}
+    assert passes[1] == {"missing": [], "withdrawn": [], "unwithdrawn": [], "mismatch": []}
+    assert {row.id: (row.owner_address, int(row.amount), row.withdrawn) for row in rows} == chain_state(chain)
+    assert open_lock in withdrawal_events and withdrawn_lock not in withdrawal_events
+    assert created_31 == 45
+    assert (stats.total_locks, int(stats.tvl_wei)) == (totals["total_locks"], totals["tvl_wei"])
@@ -0,0 +1,62 @@
+"""A fork below the indexed tip is rolled back to its exact fork point and re-indexed"""
+import pytest
+from sqlalchemy import select
+from web3 import Web3
+
+from benchmarks.mock_rpc import MockChain, GENESIS_TIMESTAMP
+from tests.conftest import run, chain_state
+
+CONTRACT_ADDRESS = "0x" + "6f" * 20
+OWNER = Web3.to_checksum_address("0x" + "ab" * 20)
+
+
+def test_fork_rolls_back_to_the_common_ancestor(mock_indexer):
+    import indexer
+    from database import engine
+    from models import Lock, Notification
+    from stats import load_platform_stats, platform_totals
+
+    chain = MockChain(CONTRACT_ADDRESS, locks=10, blocks=380, withdraw_ratio=0, users=3)
+    chain.tip = 402
+    # Both orphaned by the fork at 394: a new lock and a withdrawal of an old one
+    chain.add_lock(395, 11, OWNER, 5 * 10**18, GENESIS_TIMESTAMP + 10**8)
+    owner_1, amount_1, _ = chain_state(chain)[1]
+    chain.add_withdrawal(398, 1, owner_1, amount_1)
+
+    async def scenario():
+        mock = mock_indexer(chain)
+        target, rpc = mock.target, mock.rpc
+
+        # One wide backfill range, then the live edge
+        await mock.sync(1, 396, window=400)
+        await mock.sync(397, 402, window=400)
+        async with indexer.IndexerSession() as session:
+            session.add(Notification(
+                chain_id=target.chain_id, contract_address=target.address, lock_id=11,
+                email="saver@example.com", notify_before_seconds=3600,
+            ))
+            await session.commit()
+
+        chain.fork(394, tip=410)
+        chain.add_lock(399, 11, OWNER, 7 * 10**18, GENESIS_TIMESTAMP + 10**8)
+
+        with pytest.raises(indexer.ChainReorganized):
+            await mock.sync(window=400)
+        fork_point = await indexer.find_fork_point(rpc, target)
+        await indexer.rollback_reorg(rpc, target)
+        await mock.sync(window=400)
+
+        async with indexer.IndexerSession() as session:
+            rows = (await session.execute(select(Lock.id, Lock.owner_address, Lock.amount, Lock.withdrawn))).all()
+            notifications = (await session.execute(select(Notification.id))).all()
+            stats = await load_platform_stats(session)
+        async with engine.connect() as conn:
+            totals = await conn.run_sync(platform_totals)
+        return fork_point, rows, notifications, stats, totals
+
+    fork_point, rows, notifications, stats, totals = run(scenario())
+
+    assert fork_point == 394
+    assert {row.id: (row.owner_address, int(row.amount), row.withdrawn) for row in rows} == chain_state(chain)
+    assert notifications == []
+    assert (stats.total_locks, int(stats.tvl_wei)) == (totals["total_locks"], totals["tvl_wei"])
@@ -0,0 +1,157 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+from web3.exceptions import Web3RPCError
+
+from rpc import RPCClient, is_retryable
+from tests.conftest import run
+
+
+def header(number):
+    return {
+        "number": hex(number),
+        "hash": "0x" + f"{number:064x}",
+        "parentHash": "0x" + f"{number - 1:064x}",
+        "timestamp": hex(1_700_000_000 + number),
+    }
+
+
+async def serve(respond):
+    """A local JSON-RPC endpoint; `respond(body)` returns the aiohttp response"""
+    async def handler(request):
+        return await respond(await request.json())
+
+    app = web.Application()
+    app.router.add_post("/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def batchless_node(handler_calls):
+    """A node that answers single requests but refuses JSON-RPC batches"""
+    async def respond(body):
+        if isinstance(body, list):
+            handler_calls.append("batch")
+            return web.json_response({"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "batch requests are not supported"}})
+        handler_calls.append(body["method"])
+        results = {
+            "eth_chainId": lambda: "0x1",
+            "eth_getBlockByNumber": lambda: header(int(body["params"][0], 16)),
+            "eth_call": lambda: "0x" + "00" * 31 + "07",
+        }
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": results[body["method"]]()})
+
+    return await serve(respond)
+
+
+def test_batches_fall_back_to_single_calls_when_refused():
+    async def scenario():
+        calls = []
+        runner, url = await batchless_node(calls)
+        rpc = await RPCClient(url, retries=0).connect()
+        try:
+            headers = await rpc.get_blocks([3, 4, 5])
+            results = await rpc.eth_calls([{"to": "0x" + "11" * 20, "data": "0x"}] * 2)
+        finally:
+            await rpc.close()
+            await runner.cleanup()
+        return calls, headers, results
+
+    calls, headers, results = run(scenario())
+    assert "batch" in calls
+    assert sorted(headers) == [3, 4, 5]
+    assert headers[4]["timestamp"] == 1_700_000_004
+    assert [int.from_bytes(result, "big") for result in results] == [7, 7]
+
+
+def http_error(status):
+    return aiohttp.ClientResponseError(None, (), status=status, message="error")
+
+
+def rpc_error(code, message):
+    return Web3RPCError(message, rpc_response={"jsonrpc": "2.0", "id": 1, "error": {"code": code, "message": message}})
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (http_error(429), True),
+    (http_error(503), True),
+    (http_error(400), False),
+    (http_error(413), False),
+    (asyncio.TimeoutError(), True),
+    (aiohttp.ServerDisconnectedError(), True),
+    (rpc_error(429, "Your app has exceeded its compute units per second capacity"), True),
+    (rpc_error(-32005, "daily request count exceeded, request rate limited"), True),
+    # Digits of a status code inside block numbers or limits are not a status
+    (rpc_error(-32005, "query returned more than 10000 results. Try with this block range [0x5029, 0x5041]"), False),
+    (rpc_error(-32602, "block range too large: 0x1f4 blocks, max 503"), False),
+], ids=[
+    "http-429", "http-503", "http-400", "http-413", "timeout", "disconnected",
+    "rpc-code-429", "rpc-rate-limited", "rpc-too-many-results", "rpc-range-too-large",
+])
+def test_retry_classification(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def test_transient_statuses_are_retried_and_json_rpc_errors_are_not():
+    async def scenario():
+        calls = []
+
+        async def respond(body):
+            calls.append(body["method"])
+            if body["method"] == "eth_chainId":
+                return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": "0x1"})
+            if body["method"] == "eth_blockNumber" and calls.count("eth_blockNumber") <= 2:
+                return web.Response(status=503, text="upstream unavailable")
+            if body["method"] == "eth_blockNumber":
+                return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": "0x504"})
+            return web.json_response({"jsonrpc": "2.0", "id": body["id"], "error": {
+                "code": -32005, "message": "query returned more than 10000 results. Try with this block range [0x503, 0x504]",
+            }})
+
+        runner, url = await serve(respond)
+        rpc = await RPCClient(url, retries=3).connect()
+        try:
+            tip = await rpc.block_number()
+            with pytest.raises(Web3RPCError):
+                await rpc.get_logs({"fromBlock": 1, "toBlock": 0x504})
+        finally:
+            await rpc.close()
+            await runner.cleanup()
+        return tip, calls
+
+    tip, calls = run(scenario())
+    assert tip == 0x504
+    assert calls.count("eth_blockNumber") == 3
+    assert calls.count("eth_getLogs") == 1
+
+
+def test_identical_reads_in_flight_share_one_request():
+    async def scenario():
+        calls = []
+
+        async def respond(body):
+            calls.append(body["method"])
+            await asyncio.sleep(0.05)
+            result = "0x1" if body["method"] == "eth_chainId" else "0x10"
+            return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": result})
+
+        runner, url = await serve(respond)
+        rpc = await RPCClient(url).connect()
+        try:
+            tips = await asyncio.gather(*(rpc.block_number() for _ in range(10)))
+            # Coalescing ends with the request: a later call goes out again
+            tips.append(await rpc.block_number())
+        finally:
+            await rpc.close()
+            await runner.cleanup()
+        return tips, calls
+
+    tips, calls = run(scenario())
+    assert tips == [16] * 11
+    assert calls.count("eth_blockNumber") == 2
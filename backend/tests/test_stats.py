@@ -0,0 +1,41 @@
+"""/stats and its ETag revalidation"""
+import httpx
+import pytest
+
+from tests.conftest import run
+
+
+def fetch_stats(*if_none_match):
+    """Status of a plain GET, then of one conditional GET per If-None-Match value"""
+    import main
+
+    async def scenario():
+        main.stats_cache.clear()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.get("/stats")
+            etag = first.headers["ETag"]
+            statuses = []
+            for value in if_none_match:
+                response = await client.get("/stats", headers={"If-None-Match": value.format(etag=etag)})
+                statuses.append((response.status_code, response.headers["ETag"] == etag, response.content))
+            return first, statuses
+
+    return run(scenario())
+
+
+@pytest.mark.parametrize("if_none_match, status", [
+    ("{etag}", 304),
+    ("W/{etag}", 304),
+    ('"stale", {etag}', 304),
+    ("*", 304),
+    ('"stale"', 200),
+    ('"stale", W/"older"', 200),
+])
+def test_conditional_requests(schema, if_none_match, status):
+    first, [(conditional_status, same_etag, body)] = fetch_stats(if_none_match)
+
+    assert first.status_code == 200
+    assert first.json() == {"total_locks": 0, "tvl_eth": 0.0, "total_users": 0}
+    assert (conditional_status, same_etag) == (status, True)
+    assert body == (b"" if status == 304 else first.content)
@@ -49,6 +49,8 @@ export const useCreateLock = () => {
 
       // Create the fake lock (before the real lock is picked up by the indexer and shown in the ui)
       const optimisticLock: UILock = {
+        chain_id: 0, // Known once indexed
+        contract_address: CONTRACT_ADDRESS,
         id: Math.random(), // Temp ID
         goal_name: newLock.title,
         amount: ethers.parseEther(newLock.amount).toString(),
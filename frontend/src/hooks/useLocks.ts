@@ -4,10 +4,22 @@ import { formatEther } from "ethers";
 import { useWalletStore } from "../store/walletStore";
 import type { ApiLock, UILock } from "../types";
 
+// The API pages the list; each page names the next one in X-Next-Cursor
+const PAGE_SIZE = 500;
+
 const fetchUserLocks = async (address: string | null): Promise<ApiLock[]> => {
   if (!address) return [];
-  const { data } = await apiClient.get(`/users/${address}/locks`);
-  return data;
+  const locks: ApiLock[] = [];
+  let cursor: string | undefined;
+  do {
+    const { data, headers } = await apiClient.get<ApiLock[]>(`/users/${address}/locks`, {
+      params: { limit: PAGE_SIZE, cursor },
+    });
+    locks.push(...data);
+    const next = headers["x-next-cursor"];
+    cursor = typeof next === "string" && next ? next : undefined;
+  } while (cursor);
+  return locks;
 };
 
 export const useLocks = () => {
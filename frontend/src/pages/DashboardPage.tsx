@@ -164,7 +164,11 @@ export const DashboardPage = () => {
           </div>
         ) : (
           displayedLocks.map((lock: UILock) => (
-            <LockCard key={lock.id} lock={lock} hideAmounts={!showBalance} />
+            <LockCard
+              key={`${lock.chain_id}:${lock.contract_address}:${lock.id}`}
+              lock={lock}
+              hideAmounts={!showBalance}
+            />
           ))
         )}
       </div>
@@ -1,4 +1,7 @@
 export interface ApiLock {
+  // Lock ids are only unique within one contract on one chain
+  chain_id: number;
+  contract_address: string;
   id: number;
   goal_name: string;
   amount: string;
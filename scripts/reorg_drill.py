@@ -0,0 +1,31 @@
+import json
+import time
+from brownie import SwitchV2, accounts, chain, network
+
+# Run against a local ganache/anvil chain with the indexer pointed at it:
+#   brownie run scripts/reorg_drill.py
+# The indexer should first pick up the "orphaned" lock, then roll it back and
+# index the "canonical" lock in its place.
+
+INDEXER_WAIT_SECONDS = 15
+
+def main():
+    if not network.is_connected():
+        network.connect('development')
+
+    user = accounts[1]
+
+    with open("backend/deployment_config.json", "r") as f:
+        switch = SwitchV2.at(json.load(f)["contract_address"])
+
+    chain.snapshot()
+    tx = switch.createLock(3600, "Orphaned Lock", {'from': user, 'value': "1 ether"})
+    print(f"🔐 Created lock in block {tx.block_number}, waiting for the indexer...")
+    time.sleep(INDEXER_WAIT_SECONDS)
+
+    # Reverting the snapshot and mining a longer fork replaces that block
+    chain.revert()
+    tx = switch.createLock(3600, "Canonical Lock", {'from': accounts[2], 'value': "2 ether"})
+    chain.mine(3)
+    print(f"🔀 Forked: block {tx.block_number} now holds a different lock")
+    print("   The locks table should show 'Canonical Lock' and no 'Orphaned Lock'.")